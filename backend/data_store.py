@@ -3,16 +3,39 @@
 负责JSON文件的读写操作，提供数据存储接口
 """
 
+import atexit
+import bisect
+import hashlib
 import json
 import os
-from typing import Dict, List, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import AbstractSet, Collection, Dict, FrozenSet, List, Any, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时回退到标准库json
+    orjson = None
 
 # 数据存储目录
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 DATA_FILE = os.path.join(DATA_DIR, 'data.json')
-VERSIONS_FILE = os.path.join(DATA_DIR, 'versions.json')
+ITEMS_FILE = os.path.join(DATA_DIR, 'items.jsonl')
+VERSIONS_FILE = os.path.join(DATA_DIR, 'versions.jsonl')
+LEGACY_VERSIONS_FILE = os.path.join(DATA_DIR, 'versions.json')
+BLOBS_DIR = os.path.join(DATA_DIR, 'blobs')
 SETTINGS_FILE = os.path.join(DATA_DIR, 'settings.json')
 
+# 文件读写缓冲区大小（1MB），合并小块写入以减少系统调用
+IO_BUFFER_SIZE = 1 << 20
+
+# 已解析JSON文件的缓存：路径 -> (mtime_ns, size, 解析结果)
+# 只缓存少量小文件（如settings.json），超过上限时淘汰最早加入的条目
+_json_cache: Dict[str, Tuple[int, int, Any]] = {}
+JSON_CACHE_MAX_ENTRIES = 8
+
 # 初始数据
 INITIAL_STATE = {
     "categories": [
@@ -29,24 +52,73 @@ INITIAL_SETTINGS = {
 }
 
 
+def _json_default(obj: Any) -> Any:
+    """序列化JSON不支持的类型：集合按列表输出"""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(data: Any, indent: bool = False) -> bytes:
+    """序列化为UTF-8编码的JSON字节串（保留非ASCII字符），数据文件和API响应共用"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_json_default, option=option)
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=2, default=_json_default).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+
+def loads(raw: Union[bytes, bytearray, memoryview]) -> Any:
+    """从UTF-8编码的JSON字节串（或bytearray、memoryview）反序列化"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(str(raw, 'utf-8'))
+
+
 def ensure_data_directory():
     """确保数据目录存在"""
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
 
 
-def atomic_write(file_path: str, data: Any):
-    """原子写入JSON文件，先写临时文件再重命名"""
+def _fsync_directory(dir_path: str):
+    """同步目录项，确保重命名操作落盘（Windows上NTFS会记录重命名日志，无需此步骤）"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    dir_fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def _sync_file(f):
+    """将文件缓冲区刷新并同步到磁盘"""
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def atomic_write_bytes(file_path: str, payload: bytes):
+    """
+    原子写入字节内容，先写临时文件再重命名
+    
+    写入顺序：写临时文件 → fsync → 重命名 → fsync所在目录，
+    保证崩溃后目标文件要么是旧内容，要么是完整的新内容。
+    """
     ensure_data_directory()
+    # 写入前先使缓存失效，调用方可能已修改了缓存中的对象
+    _json_cache.pop(file_path, None)
     temp_file = file_path + '.tmp'
     try:
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        # 原子操作：重命名
-        if os.path.exists(file_path):
-            os.replace(temp_file, file_path)
-        else:
-            os.rename(temp_file, file_path)
+        with open(temp_file, 'wb', buffering=IO_BUFFER_SIZE) as f:
+            f.write(payload)
+            _sync_file(f)
+        # 原子操作：重命名（目标存在时原子替换，Windows上同样适用）
+        os.replace(temp_file, file_path)
+        _fsync_directory(os.path.dirname(file_path))
     except Exception as e:
         # 清理临时文件
         if os.path.exists(temp_file):
@@ -54,24 +126,162 @@ def atomic_write(file_path: str, data: Any):
         raise e
 
 
+def atomic_write(file_path: str, data: Any, pretty: bool = False):
+    """
+    原子写入JSON文件，先写临时文件再重命名
+    
+    数据文件只由程序读写，默认写入紧凑JSON；pretty为True时使用2空格缩进，便于人工查看
+    """
+    atomic_write_bytes(file_path, dumps(data, indent=pretty))
+
+
+def read_json_file(file_path: str, default: Any) -> Any:
+    """从JSON文件加载数据（不缓存，适合只读一次的大文件或调用方会原地修改的数据）"""
+    try:
+        with open(file_path, 'rb', buffering=IO_BUFFER_SIZE) as f:
+            return loads(f.read())
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
+    return default
+
+
 def load_json_file(file_path: str, default: Any) -> Any:
-    """从JSON文件加载数据"""
+    """
+    从JSON文件加载数据
+    
+    解析结果按 (mtime_ns, size) 缓存，文件未变化时直接返回缓存对象，
+    atomic_write写入和remove_file删除时会使对应缓存失效。
+    """
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
+        return default
+    
+    cached = _json_cache.get(file_path)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    
     try:
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        with open(file_path, 'rb', buffering=IO_BUFFER_SIZE) as f:
+            data = loads(f.read())
+        _json_cache.pop(file_path, None)
+        while len(_json_cache) >= JSON_CACHE_MAX_ENTRIES:
+            del _json_cache[next(iter(_json_cache))]
+        _json_cache[file_path] = (st.st_mtime_ns, st.st_size, data)
+        return data
     except Exception as e:
         print(f"Error loading {file_path}: {e}")
     return default
 
 
+def remove_file(file_path: str):
+    """删除文件并丢弃其缓存"""
+    _json_cache.pop(file_path, None)
+    os.remove(file_path)
+
+
+def _read_jsonl_records(file_path: str) -> List[Dict[str, Any]]:
+    """读取JSON Lines文件中的全部记录，忽略损坏的行（如崩溃时写了一半的末行）"""
+    try:
+        with open(file_path, 'rb', buffering=IO_BUFFER_SIZE) as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return []
+    records = []
+    for line in raw.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(loads(line))
+        except Exception as e:
+            print(f"Error loading record from {file_path}: {e}")
+    return records
+
+
+def _append_bytes(file_path: str, payload: bytes):
+    """将已序列化的内容追加到文件末尾并同步到磁盘"""
+    ensure_data_directory()
+    is_new = not os.path.exists(file_path)
+    with open(file_path, 'a+b', buffering=IO_BUFFER_SIZE) as f:
+        # 上次追加中途崩溃时末行没有换行：先补上换行，避免新记录接在损坏的末行后被一起丢弃
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                payload = b'\n' + payload
+        f.write(payload)
+        _sync_file(f)
+    if is_new:
+        _fsync_directory(os.path.dirname(file_path))
+
+
+def _append_jsonl_records(file_path: str, records: List[Dict[str, Any]]):
+    """将记录追加到JSON Lines文件末尾并同步到磁盘"""
+    _append_bytes(file_path, b''.join(dumps(r) + b'\n' for r in records))
+
+
 # ===== 应用状态操作 =====
+#
+# 应用状态按集合分开存放：data.json保存分类等其余字段，
+# 条目以JSON Lines格式保存在items.jsonl（按列表顺序从后到前），
+# 每行是一个条目的完整内容，或删除标记 {"id": ..., "deleted": true}。
+# 新增/修改/删除单个条目只追加一行，写盘量与条目总数无关；
+# 记录数远多于现存条目数时再整体压缩重写。
+#
+# 整体重写的items.jsonl以快照头 {"snapshot": 令牌, "state": 其余字段} 开头，随后写入的data.json记录同一个令牌
+# （itemsSnapshot字段）。两次写入之间中断时data.json的令牌与快照头不一致，加载时以快照头中的字段为准，
+# 不会出现新条目配旧分类的情况。不重写快照的增量写盘（追加记录、只重写data.json）仍是两个独立的写入。
+#
+# 修改由enqueue_save在请求线程中序列化后交给后台写盘线程，请求无需等待磁盘；
+# 防抖窗口内的多次修改合并为一次写盘。写盘完成前内存中的状态比磁盘新，load_state直接使用内存中的状态。
 
-def load_state() -> Dict[str, Any]:
-    """加载应用状态"""
-    state = load_json_file(DATA_FILE, INITIAL_STATE.copy())
-    
-    # 数据验证和修复
+# 文件中的记录数超过 现存条目数 * 该倍数 + ITEMS_COMPACT_SLACK 时触发压缩
+ITEMS_COMPACT_FACTOR = 2
+ITEMS_COMPACT_SLACK = 100
+
+# 应用状态缓存：(data.json签名, items.jsonl签名, 状态对象)，两个文件都未变化时load_state直接返回该对象
+_state_cache: Optional[Tuple[Any, Any, Dict[str, Any]]] = None
+_items_record_count = 0  # items.jsonl中的记录行数（包括尚未写盘的记录）
+_items_snapshot_token: Optional[str] = None  # items.jsonl快照头的令牌（包括尚未写盘的快照）
+
+# 后台写盘的防抖间隔（秒）：窗口内的多次修改合并为一次写盘
+SAVE_DEBOUNCE_DELAY = 0.05
+
+# 写盘失败后重试的间隔（秒）
+SAVE_RETRY_DELAY = 1.0
+
+# 保护状态缓存和等待写盘的内容；mutate_state的整个"读取-修改-保存"过程也持有该锁
+_state_lock = threading.RLock()
+
+# 串行化实际的写盘操作（后台写盘线程、flush_state_writes、save_state），
+# 加锁顺序为先_flush_lock后_state_lock，持有_state_lock时不能再获取_flush_lock
+_flush_lock = threading.Lock()
+
+# 等待后台写盘的内容（已序列化），由_state_lock保护
+_pending_state_payload: Optional[bytes] = None  # data.json的完整内容
+_pending_items_snapshot: Optional[bytes] = None  # items.jsonl的完整内容（压缩或迁移时）
+_pending_item_records: List[bytes] = []  # 追加到items.jsonl的记录行
+_writes_outstanding = False  # 是否有尚未写盘或正在写盘的内容
+
+_writer_wakeup = threading.Event()
+_writer_thread: Optional[threading.Thread] = None
+
+
+def _file_signature(file_path: str) -> Optional[Tuple[int, int]]:
+    """文件的 (mtime_ns, size)，文件不存在时返回None"""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _normalize_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """数据验证和修复（原地修改）"""
     if not isinstance(state.get('categories'), list):
         state['categories'] = INITIAL_STATE['categories'].copy()
     if not isinstance(state.get('items'), list):
@@ -87,78 +297,604 @@ def load_state() -> Dict[str, Any]:
     return state
 
 
+def _load_items() -> Optional[Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]]:
+    """
+    按文件顺序重放items.jsonl中的记录，返回 (条目列表, 快照头)，文件不存在时返回None
+    
+    旧版本写出的文件没有快照头，此时快照头为None
+    """
+    global _items_record_count, _items_snapshot_token
+    if not os.path.exists(ITEMS_FILE):
+        return None
+    records = _read_jsonl_records(ITEMS_FILE)
+    header = records[0] if records and 'snapshot' in records[0] else None
+    if header is not None:
+        records = records[1:]
+    _items_record_count = len(records)
+    _items_snapshot_token = header.get('snapshot') if header is not None else None
+    
+    # 已有条目原位更新，新条目排在最前；删除标记移除对应条目
+    by_id: Dict[str, Dict[str, Any]] = OrderedDict()
+    for record in records:
+        item_id = record.get('id')
+        if record.get('deleted'):
+            by_id.pop(item_id, None)
+        else:
+            by_id[item_id] = record
+    return list(reversed(by_id.values())), header
+
+
+def _other_fields(state: Dict[str, Any]) -> Dict[str, Any]:
+    """状态中除条目以外的字段"""
+    return {k: v for k, v in state.items() if k != 'items'}
+
+
+def _items_snapshot(state: Dict[str, Any]) -> bytes:
+    """
+    序列化items.jsonl的完整快照（快照头 + 按列表顺序从后到前的条目），
+    并更新_items_snapshot_token和_items_record_count（需持有_state_lock）
+    """
+    global _items_record_count, _items_snapshot_token
+    token = os.urandom(8).hex()
+    header = dumps({"snapshot": token, "state": _other_fields(state)}) + b'\n'
+    payload = header + b''.join(dumps(item) + b'\n' for item in reversed(state['items']))
+    _items_snapshot_token = token
+    _items_record_count = len(state['items'])
+    return payload
+
+
+def _state_payload(state: Dict[str, Any]) -> bytes:
+    """序列化data.json的内容（不含条目，记录对应的items.jsonl快照令牌）"""
+    return dumps({**_other_fields(state), "itemsSnapshot": _items_snapshot_token})
+
+
+def _cache_state(state: Dict[str, Any]):
+    """用已写入磁盘的状态对象更新状态缓存"""
+    global _state_cache
+    _state_cache = (_file_signature(DATA_FILE), _file_signature(ITEMS_FILE), state)
+
+
+def load_state() -> Dict[str, Any]:
+    """
+    加载应用状态
+    
+    data.json和items.jsonl的 (mtime_ns, size) 都未变化时直接返回缓存的状态对象，
+    跳过读取、解析和数据修复
+    """
+    global _state_cache
+    with _state_lock:
+        cached = _state_cache
+        if cached is not None and _writes_outstanding:
+            # 后台写盘尚未完成，内存中的状态比磁盘新
+            return cached[2]
+        
+        data_sig = _file_signature(DATA_FILE)
+        items_sig = _file_signature(ITEMS_FILE)
+        if data_sig is not None and cached is not None and cached[0] == data_sig and cached[1] == items_sig:
+            return cached[2]
+        
+        # 直接解析文件而不经过_json_cache：返回的对象会被原地修改，
+        # 共享缓存会让回滚后的重新加载拿到同一个被修改过的对象
+        state = read_json_file(DATA_FILE, INITIAL_STATE.copy())
+        if isinstance(state, dict):
+            token = state.pop('itemsSnapshot', None)
+            loaded = _load_items()
+            if loaded is not None:
+                items, header = loaded
+                if header is not None and header.get('snapshot') != token and isinstance(header.get('state'), dict):
+                    # 整体保存在写入快照之后、写入data.json之前中断：快照头中的字段更新
+                    state = dict(header['state'])
+                # items.jsonl存在时以其为准（旧版data.json中内嵌的条目在下次保存时移除）
+                state['items'] = items
+        state = _normalize_state(state)
+        if data_sig is not None:
+            _state_cache = (data_sig, items_sig, state)
+        return state
+
+
 def save_state(state: Dict[str, Any]) -> bool:
-    """保存应用状态"""
-    try:
-        atomic_write(DATA_FILE, state)
+    """
+    同步保存完整的应用状态（整体重写items.jsonl和data.json），成功后直接用写入的对象更新状态缓存
+    
+    items.jsonl快照写入成功即视为保存成功（快照头包含其余字段，见本节开头的说明），
+    此时等待写盘的增量修改被完整状态覆盖；快照写入失败时磁盘内容不变，等待写盘的修改原样保留。
+    不能在mutate_state中调用
+    """
+    global _state_cache, _pending_state_payload, _pending_items_snapshot, _pending_item_records, _writes_outstanding
+    global _items_snapshot_token, _items_record_count
+    with _flush_lock, _state_lock:
+        if not isinstance(state, dict):
+            try:
+                atomic_write(DATA_FILE, state)
+            except Exception as e:
+                print(f"Error saving state: {e}")
+                return False
+            _pending_state_payload = None
+            _pending_items_snapshot = None
+            _pending_item_records = []
+            _writes_outstanding = False
+            invalidate_derived_cache()
+            _state_cache = None
+            return True
+        
+        previous_token, previous_count = _items_snapshot_token, _items_record_count
+        try:
+            _normalize_state(state)
+            atomic_write_bytes(ITEMS_FILE, _items_snapshot(state))
+        except Exception as e:
+            print(f"Error saving state: {e}")
+            _items_snapshot_token, _items_record_count = previous_token, previous_count
+            return False
+        
+        # 完整状态已生效：丢弃基于旧状态构建的索引和被覆盖的增量修改
+        invalidate_derived_cache()
+        _pending_items_snapshot = None
+        _pending_item_records = []
+        _pending_state_payload = _state_payload(state)
+        try:
+            atomic_write_bytes(DATA_FILE, _pending_state_payload)
+            _pending_state_payload = None
+            _writes_outstanding = False
+            _cache_state(state)
+        except Exception as e:
+            # 加载时会使用快照头中的字段，data.json交给后台线程重试
+            print(f"Error saving state: {e}")
+            _writes_outstanding = True
+            _state_cache = (None, None, state)
+            _start_writer()
+            _writer_wakeup.set()
+        if _item_index.texts:
+            # 已建立过索引时立即逐条比较，只更新变化的条目，避免下一次搜索时等待
+            _item_index.sync(state['items'])
         return True
-    except Exception as e:
-        print(f"Error saving state: {e}")
-        return False
+
+
+def enqueue_save(state: Dict[str, Any],
+                 updated_items: Collection[Dict[str, Any]] = (),
+                 deleted_ids: Collection[str] = (),
+                 categories: bool = False) -> bool:
+    """
+    将已在内存中完成的状态修改交给后台线程写盘，不等待磁盘即返回
+    
+    参数:
+        state: 已在内存中完成修改的应用状态（通常是load_state返回的对象）
+        updated_items: 新增或修改后的条目，各追加一行完整内容
+        deleted_ids: 已删除的条目ID，各追加一行删除标记
+        categories: 分类等非条目字段是否有变化（为True时重写data.json）
+    
+    返回:
+        修改是否已成功加入写盘队列（序列化失败时返回False）
+    """
+    global _state_cache, _pending_state_payload, _pending_items_snapshot, _pending_item_records
+    global _items_record_count, _writes_outstanding
+    with _state_lock:
+        invalidate_derived_cache(categories=categories)
+        try:
+            records = [dumps(item) + b'\n' for item in updated_items]
+            records.extend(dumps({"id": item_id, "deleted": True}) + b'\n' for item_id in deleted_ids)
+            
+            # 条目仍内嵌在旧版data.json中：整体写出items.jsonl，并把条目从data.json中移除
+            migrating = not os.path.exists(ITEMS_FILE) and _pending_items_snapshot is None
+            if migrating or _items_record_count + len(records) > len(state['items']) * ITEMS_COMPACT_FACTOR + ITEMS_COMPACT_SLACK:
+                # 完整快照包含了之前等待追加的记录
+                _pending_items_snapshot = _items_snapshot(state)
+                _pending_item_records = []
+            else:
+                _pending_item_records.extend(records)
+                _items_record_count += len(records)
+            if categories or migrating:
+                _pending_state_payload = _state_payload(state)
+        except Exception as e:
+            print(f"Error saving state: {e}")
+            return False
+        
+        _writes_outstanding = True
+        if _state_cache is None or _state_cache[2] is not state:
+            _state_cache = (None, None, state)
+        _start_writer()
+        _writer_wakeup.set()
+        return True
+
+
+def _start_writer():
+    """按需启动后台写盘线程（需持有_state_lock）"""
+    global _writer_thread
+    if _writer_thread is None or not _writer_thread.is_alive():
+        _writer_thread = threading.Thread(target=_writer_loop, name='state-writer', daemon=True)
+        _writer_thread.start()
+
+
+def _writer_loop():
+    while True:
+        _writer_wakeup.wait()
+        # 等待防抖窗口，让紧随其后的修改合并到同一次写盘
+        time.sleep(SAVE_DEBOUNCE_DELAY)
+        _writer_wakeup.clear()
+        if not flush_state_writes():
+            time.sleep(SAVE_RETRY_DELAY)
+            _writer_wakeup.set()
+
+
+def flush_state_writes() -> bool:
+    """立即写入所有等待写盘的状态修改（后台线程和进程退出时调用）；不能在mutate_state中调用"""
+    global _state_cache, _pending_state_payload, _pending_items_snapshot, _pending_item_records, _writes_outstanding
+    with _flush_lock:
+        with _state_lock:
+            state_payload = _pending_state_payload
+            snapshot = _pending_items_snapshot
+            records = _pending_item_records
+            _pending_state_payload = None
+            _pending_items_snapshot = None
+            _pending_item_records = []
+            if state_payload is None and snapshot is None and not records:
+                return True
+        
+        # 写盘时不持有_state_lock，请求可以继续读取和修改内存中的状态
+        try:
+            if snapshot is not None:
+                atomic_write_bytes(ITEMS_FILE, snapshot)
+            if records:
+                _append_bytes(ITEMS_FILE, b''.join(records))
+            if state_payload is not None:
+                atomic_write_bytes(DATA_FILE, state_payload)
+            saved = True
+        except Exception as e:
+            print(f"Error saving state: {e}")
+            saved = False
+        
+        with _state_lock:
+            if not saved:
+                # 放回队列等待重试；期间又产生了新快照时，旧快照和旧记录都已被它包含
+                if _pending_items_snapshot is None:
+                    _pending_items_snapshot = snapshot
+                    _pending_item_records = records + _pending_item_records
+                if _pending_state_payload is None:
+                    _pending_state_payload = state_payload
+            elif _state_cache is not None:
+                _state_cache = (_file_signature(DATA_FILE), _file_signature(ITEMS_FILE), _state_cache[2])
+            _writes_outstanding = (_pending_state_payload is not None or _pending_items_snapshot is not None
+                                   or bool(_pending_item_records))
+        return saved
+
+
+# 进程退出前写入尚未落盘的状态修改
+atexit.register(flush_state_writes)
+
+
+def changed_items(old_items: List[Dict[str, Any]], new_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    找出new_items中新增或被替换的条目
+    
+    批量操作只复制发生变化的条目，未变化的条目与原列表是同一个对象，按对象身份比较即可
+    """
+    old_refs = {id(item) for item in old_items}
+    return [item for item in new_items if id(item) not in old_refs]
+
+
+class StateMutation:
+    """
+    mutate_state中的一次状态修改
+    
+    调用方修改state后，通过items_changed/categories_changed标记需要写回的部分；
+    退出with块时只写入被标记的部分，saved表示修改是否已成功提交写盘
+    """
+    
+    def __init__(self, state: Dict[str, Any]):
+        self.state = state
+        self.updated_items: List[Dict[str, Any]] = []
+        self.deleted_ids: List[str] = []
+        self.items_dirty = False
+        self.categories_dirty = False
+        self.saved = False
+    
+    @property
+    def dirty(self) -> bool:
+        return self.items_dirty or self.categories_dirty
+    
+    def items_changed(self, updated_items: List[Dict[str, Any]] = (), deleted_ids: List[str] = ()):
+        """标记条目已修改（新增/修改的条目和删除的条目ID）"""
+        self.items_dirty = True
+        self.updated_items.extend(updated_items)
+        self.deleted_ids.extend(deleted_ids)
+    
+    def categories_changed(self):
+        """标记分类等非条目字段已修改"""
+        self.categories_dirty = True
+
+
+@contextmanager
+def mutate_state():
+    """
+    读取-修改-保存应用状态
+    
+    用法:
+        with data_store.mutate_state() as mutation:
+            mutation.state['items'] = ...
+            mutation.items_changed(...)
+        if mutation.saved: ...
+    
+    整个过程持有_state_lock；没有标记修改时不写盘，被标记的部分交给后台线程写盘（见enqueue_save）。
+    with块内抛出异常或修改未能加入写盘队列时丢弃内存中的修改（有尚未写盘的修改时无法从磁盘恢复，只能保留内存中的状态）
+    """
+    global _state_cache
+    with _state_lock:
+        mutation = StateMutation(load_state())
+        items_before = mutation.state['items']
+        try:
+            yield mutation
+        except BaseException:
+            # 缓存中的状态对象可能已被部分修改，下次加载时从磁盘重新读取
+            if not _writes_outstanding:
+                _state_cache = None
+            # 未上报的修改可能已留在内存中的状态里，派生索引下次使用时重新同步
+            invalidate_derived_cache()
+            _item_index.source = None
+            raise
+        if not mutation.dirty:
+            return
+        if mutation.items_dirty:
+            _item_index.apply(items_before, mutation.state['items'], mutation.updated_items, mutation.deleted_ids)
+        mutation.saved = enqueue_save(
+            mutation.state,
+            mutation.updated_items,
+            mutation.deleted_ids,
+            categories=mutation.categories_dirty
+        )
+        if not mutation.saved and not _writes_outstanding:
+            # 修改未能加入写盘队列，同样丢弃内存中已原地修改的状态
+            _state_cache = None
 
 
 # ===== 版本历史操作 =====
+#
+# 版本历史以JSON Lines格式追加写入versions.jsonl（按时间从旧到新），
+# 每行是一个版本记录，或删除标记 {"id": ..., "deleted": true}。
+# 新增/删除版本只追加一行，记录数超过 maxVersions 的若干倍时再整体压缩重写。
+#
+# 版本记录只保存元数据，快照内容按哈希存放在 blobs/<digest>.json，
+# 内容相同的快照（如无改动时的自动保存）共用同一个文件。
+
+# 版本写入的防抖间隔（秒）：窗口内的多次add_version合并为一次写盘
+VERSIONS_FLUSH_DELAY = 0.5
 
-def load_versions() -> List[Dict[str, Any]]:
-    """加载版本历史"""
-    return load_json_file(VERSIONS_FILE, [])
+# 文件中的记录数超过 maxVersions * 该倍数时触发压缩
+VERSIONS_COMPACT_FACTOR = 2
+
+# 内存中的版本历史（从新到旧，与磁盘一致或更新），由_versions_lock保护
+_versions_lock = threading.RLock()
+_versions_buffer: Optional[List[Dict[str, Any]]] = None
+_versions_pending: List[Dict[str, Any]] = []  # 尚未追加到文件的记录
+_versions_record_count = 0  # 文件中的记录行数
+_versions_timer: Optional[threading.Timer] = None
+
+
+def _max_versions() -> int:
+    return load_settings().get('maxVersions', 20)
+
+
+def _blob_path(digest: str) -> str:
+    return os.path.join(BLOBS_DIR, f'{digest}.json')
+
+
+def _write_blob(payload: bytes) -> str:
+    """按内容哈希保存已序列化的快照，已存在相同内容时跳过写入，返回哈希值"""
+    digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+    blob_path = _blob_path(digest)
+    if not os.path.exists(blob_path):
+        os.makedirs(BLOBS_DIR, exist_ok=True)
+        atomic_write_bytes(blob_path, payload)
+    return digest
+
+
+def _prune_blobs(versions: List[Dict[str, Any]]):
+    """删除不再被任何版本引用的快照文件"""
+    if not os.path.isdir(BLOBS_DIR):
+        return
+    referenced = {v.get('blob') for v in versions}
+    for name in os.listdir(BLOBS_DIR):
+        digest, ext = os.path.splitext(name)
+        if ext == '.json' and digest not in referenced:
+            remove_file(os.path.join(BLOBS_DIR, name))
+
+
+def _externalize_version_data(version: Dict[str, Any]) -> Dict[str, Any]:
+    """将旧格式中内嵌的快照移到blob文件，返回只含元数据的版本记录"""
+    if 'data' not in version:
+        return version
+    record = {k: v for k, v in version.items() if k != 'data'}
+    payload = dumps(version['data'])
+    record['blob'] = _write_blob(payload)
+    record.setdefault('size', len(payload))
+    return record
+
+
+def _load_version_blob(version: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """读取版本记录对应的快照内容"""
+    if 'data' in version:
+        return version['data']
+    if not version.get('blob'):
+        return None
+    # 快照可能很大且通常只读取一次，不放入_json_cache
+    return read_json_file(_blob_path(version['blob']), None)
+
+
+def _get_versions_buffer() -> List[Dict[str, Any]]:
+    """获取内存中的版本列表，首次访问时从磁盘加载（需持有_versions_lock）"""
+    global _versions_buffer, _versions_record_count
+    if _versions_buffer is not None:
+        return _versions_buffer
+    
+    if not os.path.exists(VERSIONS_FILE) and os.path.exists(LEGACY_VERSIONS_FILE):
+        # 从旧版versions.json迁移
+        versions = load_json_file(LEGACY_VERSIONS_FILE, [])
+        _versions_buffer = _write_versions_file(versions)
+        remove_file(LEGACY_VERSIONS_FILE)
+        return _versions_buffer
+    
+    records = _read_jsonl_records(VERSIONS_FILE)
+    _versions_record_count = len(records)
+    
+    # 按文件顺序重放记录：删除标记移除对应版本，超出数量上限时淘汰最旧的版本
+    max_versions = _max_versions()
+    by_id: Dict[str, Dict[str, Any]] = OrderedDict()
+    for record in records:
+        version_id = record.get('id')
+        if record.get('deleted'):
+            by_id.pop(version_id, None)
+            continue
+        by_id[version_id] = record
+        while len(by_id) > max_versions:
+            by_id.popitem(last=False)
+    
+    _versions_buffer = list(reversed(by_id.values()))
+    return _versions_buffer
+
+
+def _write_versions_file(versions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    压缩：用当前版本列表整体重写versions.jsonl，并清理无引用的快照（需持有_versions_lock）
+    
+    返回实际写入的（只含元数据的）版本记录列表
+    """
+    global _versions_record_count
+    versions = [_externalize_version_data(v) for v in versions]
+    payload = b''.join(dumps(v) + b'\n' for v in reversed(versions))
+    atomic_write_bytes(VERSIONS_FILE, payload)
+    _versions_record_count = len(versions)
+    _prune_blobs(versions)
+    return versions
+
+
+def _append_version_records(records: List[Dict[str, Any]]):
+    """将记录追加到versions.jsonl末尾（需持有_versions_lock）"""
+    global _versions_record_count
+    _append_jsonl_records(VERSIONS_FILE, records)
+    _versions_record_count += len(records)
+
+
+def _schedule_versions_flush():
+    """（重新）启动防抖定时器（需持有_versions_lock）"""
+    global _versions_timer
+    if _versions_timer is not None:
+        _versions_timer.cancel()
+    _versions_timer = threading.Timer(VERSIONS_FLUSH_DELAY, flush_versions)
+    _versions_timer.daemon = True
+    _versions_timer.start()
+
+
+def flush_versions() -> bool:
+    """将尚未写盘的版本记录立即追加到磁盘，必要时压缩文件"""
+    global _versions_pending, _versions_timer
+    with _versions_lock:
+        if _versions_timer is not None:
+            _versions_timer.cancel()
+            _versions_timer = None
+        if not _versions_pending:
+            return True
+        try:
+            if _versions_record_count + len(_versions_pending) > _max_versions() * VERSIONS_COMPACT_FACTOR:
+                _write_versions_file(_versions_buffer)
+            else:
+                _append_version_records(_versions_pending)
+            _versions_pending = []
+            return True
+        except Exception as e:
+            print(f"Error flushing versions: {e}")
+            return False
+
+
+def load_versions(include_data: bool = False) -> List[Dict[str, Any]]:
+    """
+    加载版本历史
+    
+    默认只返回元数据；include_data为True时为每个版本附带快照内容（data字段）
+    """
+    with _versions_lock:
+        versions = list(_get_versions_buffer())
+    if include_data:
+        versions = [{**v, "data": _load_version_blob(v)} for v in versions]
+    return versions
+
+
+def load_version_data(version_id: str) -> Optional[Dict[str, Any]]:
+    """加载指定版本的快照内容，版本不存在时返回None"""
+    with _versions_lock:
+        version = next((v for v in _get_versions_buffer() if v.get('id') == version_id), None)
+    if version is None:
+        return None
+    return _load_version_blob(version)
 
 
 def save_versions(versions: List[Dict[str, Any]]) -> bool:
-    """保存版本历史"""
-    try:
-        atomic_write(VERSIONS_FILE, versions)
-        return True
-    except Exception as e:
-        print(f"Error saving versions: {e}")
-        return False
+    """保存版本历史（立即整体重写）"""
+    global _versions_buffer, _versions_pending
+    with _versions_lock:
+        try:
+            _versions_buffer = _write_versions_file(versions)
+            _versions_pending = []
+            return True
+        except Exception as e:
+            print(f"Error saving versions: {e}")
+            return False
 
 
 def add_version(state: Dict[str, Any], label: str = 'Auto-save') -> Optional[Dict[str, Any]]:
-    """添加新版本到历史"""
+    """
+    添加新版本到历史
+    
+    快照内容立即按哈希写入blob文件；版本记录先写入内存，
+    再由防抖定时器合并追加到versions.jsonl，写盘开销与历史长度无关。
+    返回的版本附带data字段，与旧接口保持一致。
+    """
+    global _versions_buffer
     try:
-        settings = load_settings()
-        versions = load_versions()
+        max_versions = _max_versions()
         
         # 生成版本ID（时间戳）
-        import time
         timestamp = int(time.time() * 1000)
         
-        # 计算数据大小
-        json_str = json.dumps(state, ensure_ascii=False)
-        size = len(json_str.encode('utf-8'))
-        
-        new_version = {
-            "id": f"{timestamp}_{hash(json_str) & 0xFFFFFF:06x}",
-            "timestamp": timestamp,
-            "label": label,
-            "data": state,
-            "size": size
-        }
+        # 只序列化一次：数据大小、内容哈希和快照文件共用同一份字节
+        payload = dumps(state)
         
         # 添加到历史顶部，限制数量
-        versions.insert(0, new_version)
-        versions = versions[:settings.get('maxVersions', 20)]
-        
-        if save_versions(versions):
-            return new_version
-        return None
+        with _versions_lock:
+            # 先加载（必要时迁移）版本列表再写快照：迁移时的压缩会清理未被引用的快照文件
+            versions = _get_versions_buffer()
+            digest = _write_blob(payload)
+            new_version = {
+                "id": f"{timestamp}_{digest[:6]}",
+                "timestamp": timestamp,
+                "label": label,
+                "blob": digest,
+                "size": len(payload)
+            }
+            versions.insert(0, new_version)
+            _versions_buffer = versions[:max_versions]
+            _versions_pending.append(new_version)
+            _schedule_versions_flush()
+        return {**new_version, "data": state}
     except Exception as e:
         print(f"Error adding version: {e}")
         return None
 
 
 def delete_version(version_id: str) -> bool:
-    """删除指定版本"""
+    """删除指定版本（追加删除标记）"""
+    global _versions_buffer
     try:
-        versions = load_versions()
-        versions = [v for v in versions if v.get('id') != version_id]
-        return save_versions(versions)
+        with _versions_lock:
+            _versions_buffer = [v for v in _get_versions_buffer() if v.get('id') != version_id]
+            _versions_pending.append({"id": version_id, "deleted": True})
+            return flush_versions()
     except Exception as e:
         print(f"Error deleting version: {e}")
         return False
 
 
+# 进程退出前写入尚未落盘的版本
+atexit.register(flush_versions)
+
+
 # ===== 设置操作 =====
 
 def load_settings() -> Dict[str, Any]:
@@ -184,6 +920,155 @@ ensure_data_directory()
 
 # ===== 业务逻辑函数 =====
 
+# 基于分类/条目列表构建的派生索引缓存：类型 -> (源列表, 索引)
+# 以列表对象本身作为键（持有强引用，避免id被复用），save_state时整体失效
+_derived_cache: Dict[str, Tuple[Any, Any]] = {}
+
+# 分类树版本号，每次派生缓存失效时递增，用于识别过期的CategoryView
+_categories_version = 0
+
+
+def invalidate_derived_cache(categories: bool = True):
+    """
+    清空派生索引缓存，原地修改分类或条目列表后需调用
+    
+    categories为False时表示只有条目变化，保留分类树视图（祖先链、后代集合等）
+    """
+    global _categories_version
+    if not categories:
+        for kind in [k for k in _derived_cache if k != 'categories']:
+            del _derived_cache[kind]
+        return
+    _derived_cache.clear()
+    _categories_version += 1
+
+
+def _cached_for(kind: str, source: Any, build) -> Any:
+    """返回source对应的派生索引，同一列表对象重复调用时直接复用"""
+    cached = _derived_cache.get(kind)
+    if cached is not None and cached[0] is source:
+        return cached[1]
+    value = build(source)
+    _derived_cache[kind] = (source, value)
+    return value
+
+
+def _by_id(categories: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """构建 id -> 分类 的索引（重复id时以第一个为准）"""
+    index: Dict[str, Dict[str, Any]] = {}
+    for c in categories:
+        index.setdefault(c.get('id'), c)
+    return index
+
+
+def _ancestors_map(categories: List[Dict[str, Any]]) -> Dict[str, Tuple[str, ...]]:
+    """
+    一次遍历计算每个分类的祖先链（包括自己，从近到远）
+    已计算过的祖先链会被复用，总开销与分类数量成正比
+    """
+    by_id = _by_id(categories)
+    ancestors: Dict[str, Tuple[str, ...]] = {}
+    
+    for start_id in by_id:
+        # 向上收集尚未计算的路径，遇到已计算的节点、根节点或环时停止
+        path = []
+        on_path = set()
+        current_id = start_id
+        while current_id and current_id not in ancestors and current_id not in on_path:
+            path.append(current_id)
+            on_path.add(current_id)
+            category = by_id.get(current_id)
+            current_id = category.get('parentId') if category else None
+        
+        chain = ancestors.get(current_id, ()) if current_id not in on_path else ()
+        for node_id in reversed(path):
+            chain = (node_id,) + chain
+            ancestors[node_id] = chain
+    
+    return ancestors
+
+
+def _build_children_index(categories: List[Dict[str, Any]]) -> Dict[Optional[str], List[Dict[str, Any]]]:
+    """一次遍历构建 parentId -> 子分类列表 的索引"""
+    index: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for c in categories:
+        index.setdefault(c.get('parentId'), []).append(c)
+    return index
+
+
+def _walk_descendants(root_id: str, children_index: Dict[Optional[str], List[Dict[str, Any]]]) -> List[str]:
+    """迭代遍历子树，visited防止异常数据中的环导致死循环"""
+    ids = []
+    visited = {root_id}
+    stack = [root_id]
+    while stack:
+        current_id = stack.pop()
+        for child in children_index.get(current_id, ()):
+            child_id = child['id']
+            if child_id in visited:
+                continue
+            visited.add(child_id)
+            ids.append(child_id)
+            stack.append(child_id)
+    return ids
+
+
+class CategoryView:
+    """
+    分类列表的视图，按需构建并缓存子分类索引、祖先链和各分类的后代集合
+    
+    同一版本的分类树只计算一次，业务函数的categories参数均可传入CategoryView；
+    传入普通列表时会自动复用该列表对应的视图。
+    """
+    
+    def __init__(self, categories: List[Dict[str, Any]]):
+        self.categories = categories
+        self.version = _categories_version
+        self._children_index: Optional[Dict[Optional[str], List[Dict[str, Any]]]] = None
+        self._ancestors: Optional[Dict[str, Tuple[str, ...]]] = None
+        self._descendants: Dict[str, Tuple[str, ...]] = {}
+        self._branches: Dict[str, FrozenSet[str]] = {}
+    
+    @property
+    def children_index(self) -> Dict[Optional[str], List[Dict[str, Any]]]:
+        if self._children_index is None:
+            self._children_index = _build_children_index(self.categories)
+        return self._children_index
+    
+    @property
+    def ancestors(self) -> Dict[str, Tuple[str, ...]]:
+        if self._ancestors is None:
+            self._ancestors = _ancestors_map(self.categories)
+        return self._ancestors
+    
+    def descendants(self, root_id: str) -> Tuple[str, ...]:
+        """某个分类的所有子分类ID（不包括自己）"""
+        ids = self._descendants.get(root_id)
+        if ids is None:
+            ids = tuple(_walk_descendants(root_id, self.children_index))
+            self._descendants[root_id] = ids
+        return ids
+    
+    def branch(self, root_id: str) -> FrozenSet[str]:
+        """某个分类及其所有子分类的ID集合"""
+        ids = self._branches.get(root_id)
+        if ids is None:
+            ids = frozenset((root_id, *self.descendants(root_id)))
+            self._branches[root_id] = ids
+        return ids
+
+
+def _category_view(categories) -> Optional[CategoryView]:
+    """将分类列表或CategoryView统一为当前版本的CategoryView，分类为空时返回None"""
+    if isinstance(categories, CategoryView):
+        if categories.version == _categories_version:
+            return categories
+        categories = categories.categories
+    if not categories or not isinstance(categories, list):
+        return None
+    return _cached_for('categories', categories, CategoryView)
+
+
 def get_ancestor_ids(category_id: str, categories: List[Dict[str, Any]]) -> List[str]:
     """
     获取某个分类的所有祖先分类ID（包括自己）
@@ -192,21 +1077,20 @@ def get_ancestor_ids(category_id: str, categories: List[Dict[str, Any]]) -> List
     示例: 工作资料 → 项目A → 文档
     get_ancestor_ids("文档") 返回 ["文档", "项目A", "工作资料"]
     """
-    if not categories or not isinstance(categories, list):
+    view = _category_view(categories)
+    if view is None:
         return [category_id]
     
-    ancestors = [category_id]
-    current_id = category_id
-    
-    # 向上遍历，找到所有祖先
-    while True:
-        category = next((c for c in categories if c.get('id') == current_id), None)
-        if not category or not category.get('parentId'):
-            break
-        ancestors.append(category['parentId'])
-        current_id = category['parentId']
-    
-    return ancestors
+    return list(view.ancestors.get(category_id, (category_id,)))
+
+
+def _expand_category_set(category_ids: List[str], categories: List[Dict[str, Any]]) -> FrozenSet[str]:
+    """扩展分类ID集合，包含所有祖先分类（内部使用，避免集合与列表之间的来回转换）"""
+    view = _category_view(categories)
+    if view is None:
+        return frozenset(category_ids)
+    ancestors = view.ancestors
+    return frozenset().union(*(ancestors.get(cat_id, (cat_id,)) for cat_id in category_ids))
 
 
 def expand_category_ids(category_ids: List[str], categories: List[Dict[str, Any]]) -> List[str]:
@@ -217,37 +1101,26 @@ def expand_category_ids(category_ids: List[str], categories: List[Dict[str, Any]
     如果"文档"属于"项目A"属于"工作资料"，"报告"属于"工作资料"
     返回: ["文档", "项目A", "工作资料", "报告"] (去重后)
     """
-    expanded = set()
-    for cat_id in category_ids:
-        # 添加该分类及其所有祖先
-        expanded.update(get_ancestor_ids(cat_id, categories))
-    return list(expanded)
+    # 结果会直接写入条目的categoryIds并序列化为JSON，因此在此转换为列表
+    return list(_expand_category_set(category_ids, categories))
 
 
 def get_descendant_ids(root_id: str, categories: List[Dict[str, Any]]) -> List[str]:
     """
-    递归获取某个分类的所有子分类ID
+    获取某个分类的所有子分类ID
     这个函数之前在前端，现在移到后端
+    
+    使用分类树视图中缓存的结果
     """
-    if not categories or not isinstance(categories, list):
+    view = _category_view(categories)
+    if view is None:
         return []
-    
-    # 找到所有子分类
-    children = [c for c in categories if c.get('parentId') == root_id]
-    
-    # 收集子分类ID
-    ids = [c['id'] for c in children]
-    
-    # 递归获取每个子分类的子分类
-    for child in children:
-        ids.extend(get_descendant_ids(child['id'], categories))
-    
-    return ids
+    return list(view.descendants(root_id))
 
 
 def toggle_category_association(
     items: List[Dict[str, Any]],
-    item_ids: List[str],
+    item_ids: Collection[str],
     category_id: str,
     categories: List[Dict[str, Any]]
 ) -> List[Dict[str, Any]]:
@@ -264,58 +1137,61 @@ def toggle_category_association(
     
     参数：
         items: 所有条目
-        item_ids: 要操作的条目ID列表
+        item_ids: 要操作的条目ID列表（或集合）
         category_id: 目标分类ID
         categories: 所有分类列表
     
     返回：
         更新后的条目列表
     """
+    target_ids = _as_id_set(item_ids)
+    
     # 1. 检查所有选中条目是否都包含该分类
-    selected_items = [item for item in items if item['id'] in item_ids]
+    selected_items = [item for item in items if item['id'] in target_ids]
+    if not selected_items:
+        # 没有命中任何条目（如取消的拖拽），直接返回原列表
+        return items
     all_have_category = all(
         category_id in item.get('categoryIds', [])
         for item in selected_items
     )
     
-    # 2. 确定要操作的分类ID集合
+    # 2. 确定要操作的分类ID集合（直接使用分类树视图中缓存的集合，不再复制）
+    view = _category_view(categories)
     if all_have_category:
         # === 移除操作 ===
-        # 获取该分类的所有子类
-        descendants = get_descendant_ids(category_id, categories)
-        
-        if descendants:
-            # 如果有子类，说明是父类别 → 移除父类 + 所有子类
-            categories_to_remove = set([category_id] + descendants)
-        else:
-            # 如果没有子类，说明是子类别 → 只移除该子类
-            categories_to_remove = set([category_id])
+        # 有子类时是父类别 → 移除父类 + 所有子类；否则是子类别 → 只移除该子类
+        categories_to_remove = view.branch(category_id) if view is not None else frozenset((category_id,))
     else:
         # === 添加操作 ===
         # 检查该分类是否有子类
-        descendants = get_descendant_ids(category_id, categories)
+        descendants = view.descendants(category_id) if view is not None else ()
         
-        if descendants:
+        if descendants or view is None:
             # 如果有子类，说明是父类别 → 只添加该父类
-            categories_to_add = [category_id]
+            categories_to_add = (category_id,)
         else:
             # 如果没有子类，说明是子类别 → 添加该子类 + 所有祖先
-            categories_to_add = get_ancestor_ids(category_id, categories)
+            categories_to_add = view.ancestors.get(category_id, (category_id,))
     
     # 3. 更新条目
     updated_items = []
     for item in items:
-        if item['id'] in item_ids:
-            item_copy = item.copy()
+        if item['id'] in target_ids:
             current_ids = set(item.get('categoryIds', []))
             
             if all_have_category:
                 # 移除操作
                 current_ids -= categories_to_remove
+            elif current_ids.issuperset(categories_to_add):
+                # 已包含要添加的全部分类，保持原样
+                updated_items.append(item)
+                continue
             else:
                 # 添加操作
                 current_ids.update(categories_to_add)
             
+            item_copy = item.copy()
             item_copy['categoryIds'] = list(current_ids)
             updated_items.append(item_copy)
         else:
@@ -341,52 +1217,335 @@ def filter_items(items: List[Dict[str, Any]],
     返回:
         过滤后的条目列表
     """
-    result = items.copy() if items else []
+    # 预先计算每个选中分类及其所有子分类的ID集合（交集逻辑：需命中每个分支）
+    branch_sets = []
+    if selected_category_ids:
+        view = _category_view(categories)
+        branch_sets = [
+            view.branch(filter_id) if view is not None else frozenset([filter_id])
+            for filter_id in selected_category_ids
+        ]
     
-    # 1. 按分类筛选（包含子分类）
-    if selected_category_ids and len(selected_category_ids) > 0:
-        filtered = []
-        for item in result:
-            item_category_ids = item.get('categoryIds', [])
-            if not item_category_ids:
-                continue
-            
-            # 检查是否匹配所有选中的分类（交集逻辑）
-            matches_all = True
-            for filter_id in selected_category_ids:
-                # 获取该分类及其所有子分类的ID
-                valid_branch_ids = set([filter_id] + get_descendant_ids(filter_id, categories))
-                # 检查条目的分类ID是否在这个分支中
-                if not any(cid in valid_branch_ids for cid in item_category_ids):
-                    matches_all = False
-                    break
-            
-            if matches_all:
-                filtered.append(item)
-        
-        result = filtered
+    query = search_query.lower() if search_query and search_query.strip() else None
+    if not branch_sets and query is None:
+        # 无筛选条件：直接返回原列表，不复制
+        return items if items is not None else []
+    if query is not None and len(_search_cache) > 2 * len(items or ()):
+        # 丢弃已删除条目的缓存，防止无限增长
+        _search_cache.clear()
     
-    # 2. 按搜索关键词筛选
-    if search_query and search_query.strip():
-        query = search_query.lower()
-        filtered = []
-        
-        for item in result:
-            # 搜索描述
-            matches_desc = (item.get('description') or '').lower().find(query) != -1
-            # 搜索文件名
-            matches_filename = (item.get('fileName') or '').lower().find(query) != -1
-            # 搜索内容（仅文本和URL类型）
-            matches_content = False
-            if item.get('type') in ['text', 'url']:
-                matches_content = (item.get('content') or '').lower().find(query) != -1
-            
-            if matches_desc or matches_filename or matches_content:
-                filtered.append(item)
+    if not items:
+        return []
+    
+    index = _item_index_for(items)
+    if not index.unique():
+        # 有重复ID时无法按ID定位条目：逐条筛选
+        return [
+            item for item in items
+            if all(any(cid in branch for cid in item.get('categoryIds') or ()) for branch in branch_sets)
+            and (query is None or _matches_query(item, query))
+        ]
+    
+    # 先用倒排索引求出候选条目ID：每个分类分支取并集，分支之间及与三元组候选取交集
+    matched_ids = None
+    for branch in branch_sets:
+        matched = index.branch_ids(branch)
+        matched_ids = matched if matched_ids is None else matched_ids & matched
+        if not matched_ids:
+            return []
+    if query is not None and len(query) >= SEARCH_NGRAM:
+        matched = index.search_ids(query)
+        matched_ids = matched if matched_ids is None else matched_ids & matched
+    elif query is not None and matched_ids is None and SEARCH_BUFFER_SEP not in query:
+        # 短关键词无法使用三元组索引：在拼接的搜索文本中直接查找，命中即为结果
+        buffer, starts = index.search_buffer()
+        return [items[i] for i in _scan_search_buffer(buffer, starts, query)]
+    
+    if matched_ids is None:
+        candidates = items
+    else:
+        item_positions = index.positions()
+        candidates = [items[i] for i in sorted(item_positions[item_id] for item_id in matched_ids)]
+    
+    # 分类命中已由索引保证；关键词仍需对候选条目逐个验证（三元组只是必要条件）
+    if query is None:
+        return candidates
+    return [item for item in candidates if _matches_query(item, query)]
+
+
+# 条目搜索文本缓存：条目ID -> (字段签名, 小写的可搜索文本)
+_search_cache: Dict[str, Tuple[int, str]] = {}
+
+
+def _searchable_text(item: Dict[str, Any]) -> str:
+    """
+    获取条目的小写可搜索文本（描述、文件名、文本/URL内容以\x01连接）
+    按字段签名缓存，字段未变化时不再重复调用lower()
+    """
+    description = item.get('description')
+    file_name = item.get('fileName')
+    content = item.get('content') if item.get('type') in ('text', 'url') else None
+    try:
+        signature = hash((description, file_name, content))
+    except TypeError:
+        # 字段不是字符串等可哈希的值（异常数据）：不缓存
+        return f"{description or ''}\x01{file_name or ''}\x01{content or ''}".lower()
+    
+    item_id = item.get('id')
+    cached = _search_cache.get(item_id)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
+    text = f"{description or ''}\x01{file_name or ''}\x01{content or ''}".lower()
+    _search_cache[item_id] = (signature, text)
+    return text
+
+
+def _matches_query(item: Dict[str, Any], query: str) -> bool:
+    """检查条目的描述、文件名或内容（仅文本和URL类型）是否包含小写关键词"""
+    return query in _searchable_text(item)
+
+
+# 搜索索引使用的n-gram长度
+SEARCH_NGRAM = 3
+
+# 拼接搜索文本时条目之间的分隔符（不会出现在_searchable_text的字段分隔中）
+SEARCH_BUFFER_SEP = '\x00'
+
+
+def _ngrams(text: str) -> set:
+    return {text[i:i + SEARCH_NGRAM] for i in range(len(text) - SEARCH_NGRAM + 1)}
+
+
+class ItemIndex:
+    """
+    条目的倒排索引：小写三元组 -> 条目ID集合、分类ID -> 条目ID集合、重名检查键 -> 条目ID集合，
+    以及短关键词使用的拼接搜索文本
+    
+    按条目ID而不是列表下标维护，条目的插入和删除不会使其余部分失效：
+    mutate_state提交修改时按上报的新增/修改/删除条目原地更新（见apply），
+    条目列表被整体替换（save_state、从磁盘重新加载）时逐条比较，只更新内容变化的条目（见sync）。
+    """
+    
+    def __init__(self):
+        self.source: Optional[List[Dict[str, Any]]] = None  # 索引当前对应的条目列表
+        self.texts: Dict[str, str] = {}  # 条目ID -> 小写搜索文本
+        self.grams: Dict[str, set] = {}
+        self.item_categories: Dict[str, Tuple[str, ...]] = {}  # 条目ID -> 分类ID
+        self.categories: Dict[str, set] = {}
+        self.item_names: Dict[str, Any] = {}  # 条目ID -> 重名检查键（见_name_key）
+        self.names: Dict[Tuple[Optional[str], Any], set] = {}
+        self._positions: Optional[Dict[str, int]] = None
+        self._buffer: Optional[Tuple[str, List[int]]] = None
+    
+    def _put(self, item: Dict[str, Any]):
+        item_id = item['id']
+        self._put_categories(item_id, _indexable_category_ids(item))
+        self._put_name(item_id, _item_name_key(item))
+        text = _searchable_text(item)
+        old_text = self.texts.get(item_id)
+        if old_text == text:
+            return
+        if old_text is not None:
+            self._discard_grams(item_id, old_text)
+        self.texts[item_id] = text
+        for gram in _ngrams(text):
+            postings = self.grams.get(gram)
+            if postings is None:
+                self.grams[gram] = {item_id}
+            else:
+                postings.add(item_id)
+    
+    def _put_categories(self, item_id: str, category_ids: Tuple[str, ...]):
+        old_ids = self.item_categories.get(item_id)
+        if old_ids == category_ids:
+            return
+        if old_ids is not None:
+            self._discard_categories(item_id, old_ids)
+        self.item_categories[item_id] = category_ids
+        for cid in category_ids:
+            postings = self.categories.get(cid)
+            if postings is None:
+                self.categories[cid] = {item_id}
+            else:
+                postings.add(item_id)
+    
+    def _put_name(self, item_id: str, key: Any):
+        old_key = self.item_names.get(item_id)
+        if item_id in self.item_names and old_key == key:
+            return
+        self._discard_name(item_id)
+        self.item_names[item_id] = key
+        if key is not None:
+            self.names.setdefault(key, set()).add(item_id)
+    
+    def _discard_name(self, item_id: str):
+        old_key = self.item_names.pop(item_id, None)
+        postings = self.names.get(old_key) if old_key is not None else None
+        if postings is not None:
+            postings.discard(item_id)
+            if not postings:
+                del self.names[old_key]
+    
+    def _remove(self, item_id: str):
+        old_text = self.texts.pop(item_id, None)
+        if old_text is not None:
+            self._discard_grams(item_id, old_text)
+        old_ids = self.item_categories.pop(item_id, None)
+        if old_ids is not None:
+            self._discard_categories(item_id, old_ids)
+        self._discard_name(item_id)
+    
+    def _discard_grams(self, item_id: str, text: str):
+        for gram in _ngrams(text):
+            postings = self.grams.get(gram)
+            if postings is not None:
+                postings.discard(item_id)
+                if not postings:
+                    del self.grams[gram]
+    
+    def _discard_categories(self, item_id: str, category_ids: Tuple[str, ...]):
+        for cid in category_ids:
+            postings = self.categories.get(cid)
+            if postings is not None:
+                postings.discard(item_id)
+                if not postings:
+                    del self.categories[cid]
+    
+    def sync(self, items: List[Dict[str, Any]]):
+        """与条目列表逐条比较，只更新新增、变化和已移除的条目"""
+        seen = set()
+        for item in items:
+            self._put(item)
+            seen.add(item['id'])
+        for item_id in [i for i in self.texts if i not in seen]:
+            self._remove(item_id)
+        self.source = items
+        self._positions = None
+        self._buffer = None
+    
+    def apply(self,
+              before: List[Dict[str, Any]],
+              items: List[Dict[str, Any]],
+              updated_items: Collection[Dict[str, Any]],
+              deleted_ids: Collection[str]):
+        """
+        按一次修改上报的条目原地更新索引
         
-        result = filtered
+        索引不对应修改前的列表（before）时无法增量更新，留到下一次查询时再同步
+        """
+        if self.source is not before:
+            self.source = None
+            return
+        for item_id in deleted_ids:
+            self._remove(item_id)
+        for item in updated_items:
+            self._put(item)
+        self.source = items
+        self._positions = None
+        self._buffer = None
     
-    return result
+    def unique(self) -> bool:
+        """条目ID是否互不重复；索引按ID维护，有重复ID时调用方应逐条扫描"""
+        # 已同步时索引中的ID恰好是列表中出现的ID
+        return len(self.texts) == len(self.source)
+    
+    def positions(self) -> Dict[str, int]:
+        """条目ID -> 列表下标"""
+        if self._positions is None:
+            self._positions = build_item_index(self.source)
+        return self._positions
+    
+    def search_ids(self, query: str) -> set:
+        """可能包含关键词的条目ID（所有三元组均需命中，仍需逐条验证）"""
+        postings = []
+        for gram in _ngrams(query):
+            matched = self.grams.get(gram)
+            if not matched:
+                return set()
+            postings.append(matched)
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+    
+    def branch_ids(self, branch: AbstractSet[str]) -> set:
+        """关联了分支中任一分类的条目ID"""
+        return set().union(*(self.categories.get(cid, ()) for cid in branch))
+    
+    def search_buffer(self) -> Tuple[str, List[int]]:
+        """
+        按列表顺序拼接的小写搜索文本及各条目文本的起始偏移，用str.find在C层面扫描短关键词
+        
+        各条目的文本已在索引中维护，列表变化后只需重新拼接，不再逐条计算
+        """
+        if self._buffer is None:
+            texts = self.texts
+            parts = [texts[item['id']] for item in self.source]
+            starts = []
+            offset = 0
+            for text in parts:
+                starts.append(offset)
+                offset += len(text) + 1
+            self._buffer = (SEARCH_BUFFER_SEP.join(parts), starts)
+        return self._buffer
+
+
+# 当前条目列表的索引，由mutate_state/save_state维护，查询前由_item_index_for同步
+_item_index = ItemIndex()
+
+
+def _item_index_for(items: List[Dict[str, Any]]) -> ItemIndex:
+    """返回与items同步的条目索引（索引对应的不是该列表时先逐条比较同步）"""
+    if _item_index.source is not items:
+        _item_index.sync(items)
+    return _item_index
+
+
+def _scan_search_buffer(buffer: str, starts: List[int], query: str) -> List[int]:
+    """返回搜索文本包含关键词的条目下标（升序）；query不能包含SEARCH_BUFFER_SEP"""
+    matched = []
+    find = buffer.find
+    pos = find(query)
+    while pos != -1:
+        i = bisect.bisect_right(starts, pos) - 1
+        matched.append(i)
+        # 同一条目只记录一次，从下一个条目的开头继续查找
+        if i + 1 >= len(starts):
+            break
+        pos = find(query, starts[i + 1])
+    return matched
+
+
+def _name_key(item_type: Optional[str], name: Any) -> Tuple[Optional[str], Any]:
+    """重名检查的索引键：文本和URL类型共用按content的命名空间，文件类型按(类型, fileName)"""
+    if item_type in ('text', 'url'):
+        return ('text/url', name)
+    return (item_type, name)
+
+
+def _indexable_category_ids(item: Dict[str, Any]) -> Tuple[str, ...]:
+    """条目中可以放入倒排索引的分类ID（忽略不可哈希的异常值，它们不可能与任何分类ID相同）"""
+    category_ids = item.get('categoryIds')
+    if not isinstance(category_ids, list):
+        return ()
+    if all(isinstance(cid, str) for cid in category_ids):
+        return tuple(category_ids)
+    return tuple(cid for cid in category_ids if _is_hashable(cid))
+
+
+def _is_hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _item_name_key(item: Dict[str, Any]) -> Optional[Tuple[Optional[str], Any]]:
+    """条目的重名检查键；名称不可哈希（不可能与任何字符串名称相同）时返回None"""
+    item_type = item.get('type')
+    name = item.get('content') if item_type in ('text', 'url') else item.get('fileName')
+    key = _name_key(item_type, name)
+    return key if _is_hashable(key) else None
 
 
 def validate_item_name(items: List[Dict[str, Any]], 
@@ -409,25 +1568,39 @@ def validate_item_name(items: List[Dict[str, Any]],
     if not item_name or not item_name.strip():
         return "名称不能为空"
     
-    for item in items:
+    index = _item_index_for(items)
+    if index.unique():
+        # 名称索引随条目的新增/修改/删除原地更新
+        existing_ids = index.names.get(_name_key(item_type, item_name), ())
+    else:
+        # 有重复ID时无法按ID维护名称索引：逐条比较
+        key = _name_key(item_type, item_name)
+        existing_ids = [item.get('id') for item in items if _item_name_key(item) == key]
+    for existing_id in existing_ids:
         # 跳过要排除的条目（编辑时）
-        if exclude_id and item.get('id') == exclude_id:
+        if exclude_id and existing_id == exclude_id:
             continue
         
-        # 对于文本和URL类型，检查content
+        # 对于文本和URL类型，检查content；对于文件类型，检查fileName
         if item_type in ['text', 'url']:
-            if item.get('type') in ['text', 'url'] and item.get('content') == item_name:
-                return f"已存在同名条目：{item_name}，请修改名称。"
-        # 对于文件类型，检查fileName
-        else:
-            if item.get('type') == item_type and item.get('fileName') == item_name:
-                return f"已存在同名文件：{item_name}，请修改文件名或选择其他文件。"
+            return f"已存在同名条目：{item_name}，请修改名称。"
+        return f"已存在同名文件：{item_name}，请修改文件名或选择其他文件。"
     
     return None
 
 
+def _as_id_set(ids: Collection[str]) -> AbstractSet[str]:
+    """转换为ID集合用于成员判断；调用方已传入set/frozenset时直接使用，不再复制"""
+    return ids if isinstance(ids, (set, frozenset)) else set(ids)
+
+
+def _has_targets(items: List[Dict[str, Any]], target_ids: set) -> bool:
+    """是否有条目命中目标ID（找到第一个即返回）"""
+    return bool(target_ids) and any(item['id'] in target_ids for item in items)
+
+
 def batch_add_tags(items: List[Dict[str, Any]], 
-                   item_ids: List[str],
+                   item_ids: Collection[str],
                    category_id: str,
                    categories: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """
@@ -435,26 +1608,34 @@ def batch_add_tags(items: List[Dict[str, Any]],
     
     参数:
         items: 所有条目
-        item_ids: 要添加标签的条目ID列表
+        item_ids: 要添加标签的条目ID列表（或集合）
         category_id: 要添加的分类ID
         categories: 所有分类列表（用于扩展祖先分类）
     
     返回:
         更新后的条目列表
     """
+    target_ids = _as_id_set(item_ids)
+    if not _has_targets(items, target_ids):
+        return items
+    
     # 获取要添加的分类ID及其所有祖先
     if categories:
-        category_ids_to_add = expand_category_ids([category_id], categories)
+        to_add = _expand_category_set([category_id], categories)
     else:
-        category_ids_to_add = [category_id]
+        to_add = frozenset((category_id,))
     
     updated_items = []
     for item in items:
-        if item['id'] in item_ids:
-            item_copy = item.copy()
+        if item['id'] in target_ids:
             current_ids = set(item.get('categoryIds', []))
+            if current_ids.issuperset(to_add):
+                # 已包含全部分类，无需复制
+                updated_items.append(item)
+                continue
+            item_copy = item.copy()
             # 添加新分类及其祖先
-            current_ids.update(category_ids_to_add)
+            current_ids.update(to_add)
             item_copy['categoryIds'] = list(current_ids)
             updated_items.append(item_copy)
         else:
@@ -464,7 +1645,7 @@ def batch_add_tags(items: List[Dict[str, Any]],
 
 
 def batch_edit(items: List[Dict[str, Any]],
-               item_ids: List[str],
+               item_ids: Collection[str],
                description: str = None,
                category_id: str = None) -> List[Dict[str, Any]]:
     """
@@ -472,22 +1653,33 @@ def batch_edit(items: List[Dict[str, Any]],
     
     参数:
         items: 所有条目
-        item_ids: 要编辑的条目ID列表
+        item_ids: 要编辑的条目ID列表（或集合）
         description: 新的描述（如果提供）
         category_id: 要添加的分类ID（如果提供）
     
     返回:
         更新后的条目列表
     """
+    target_ids = _as_id_set(item_ids)
+    if not _has_targets(items, target_ids):
+        return items
+    
+    update_description = bool(description and description.strip())
     updated_items = []
     for item in items:
-        if item['id'] in item_ids:
+        if item['id'] in target_ids:
+            needs_desc_update = update_description and item.get('description') != description
+            needs_cat_update = category_id and category_id not in item.get('categoryIds', [])
+            if not needs_desc_update and not needs_cat_update:
+                # 没有字段变化，无需复制
+                updated_items.append(item)
+                continue
             item_copy = item.copy()
             # 更新描述
-            if description and description.strip():
+            if needs_desc_update:
                 item_copy['description'] = description
             # 添加分类
-            if category_id and category_id not in item.get('categoryIds', []):
+            if needs_cat_update:
                 item_copy['categoryIds'] = item.get('categoryIds', []) + [category_id]
             updated_items.append(item_copy)
         else:
@@ -496,18 +1688,83 @@ def batch_edit(items: List[Dict[str, Any]],
     return updated_items
 
 
-def batch_delete(items: List[Dict[str, Any]], item_ids: List[str]) -> List[Dict[str, Any]]:
+def batch_delete(items: List[Dict[str, Any]], item_ids: Collection[str]) -> List[Dict[str, Any]]:
     """
     批量删除条目
     
     参数:
         items: 所有条目
-        item_ids: 要删除的条目ID列表
+        item_ids: 要删除的条目ID列表（或集合）
     
     返回:
         删除后的条目列表
     """
-    return [item for item in items if item['id'] not in item_ids]
+    target_ids = _as_id_set(item_ids)
+    if not _has_targets(items, target_ids):
+        return items
+    return [item for item in items if item['id'] not in target_ids]
+
+
+def batch_delete_inplace(items: List[Dict[str, Any]], item_ids: Collection[str]) -> int:
+    """
+    批量删除条目（直接修改items列表）
+    
+    参数:
+        items: 所有条目
+        item_ids: 要删除的条目ID列表（或集合）
+    
+    返回:
+        删除的条目数量
+    """
+    original_count = len(items)
+    if len(item_ids) == 1:
+        # 常见的单条删除：通过索引定位第一个匹配的条目，只处理其后的部分
+        item_id = next(iter(item_ids))
+        i = find_item_index(items, item_id)
+        if i is not None:
+            del items[i]
+            # 重复ID时删除全部匹配的条目，与多条删除一致
+            items[i:] = [item for item in items[i:] if item['id'] != item_id]
+    else:
+        target_ids = _as_id_set(item_ids)
+        items[:] = [item for item in items if item['id'] not in target_ids]
+    return original_count - len(items)
+
+
+def build_item_index(items: List[Dict[str, Any]]) -> Dict[str, int]:
+    """构建 ID -> 列表下标 的索引（重复ID时以第一个为准，与线性查找一致）"""
+    index: Dict[str, int] = {}
+    for i, item in enumerate(items):
+        index.setdefault(item['id'], i)
+    return index
+
+
+# ID -> 下标 索引缓存：类型 -> (源列表, 索引)
+# 与_derived_cache不同，保存后不清空：原位替换条目不影响下标，查找时校验命中结果，过期时再重建
+_position_cache: Dict[str, Tuple[List[Dict[str, Any]], Dict[str, int]]] = {}
+
+
+def _cached_position(kind: str, entries: List[Dict[str, Any]], entry_id: str) -> Optional[int]:
+    """通过缓存的 ID -> 下标 索引查找位置，不存在时返回None"""
+    cached = _position_cache.get(kind)
+    if cached is not None and cached[0] is entries and len(cached[1]) <= len(entries):
+        i = cached[1].get(entry_id)
+        if i is not None and i < len(entries) and entries[i]['id'] == entry_id:
+            return i
+    # 索引过期（如列表头部插入或删除了条目）或未命中：重建后再查一次
+    index = build_item_index(entries)
+    _position_cache[kind] = (entries, index)
+    return index.get(entry_id)
+
+
+def find_item_index(items: List[Dict[str, Any]], item_id: str) -> Optional[int]:
+    """查找条目在列表中的下标，不存在时返回None"""
+    return _cached_position('items', items, item_id)
+
+
+def find_category_index(categories: List[Dict[str, Any]], category_id: str) -> Optional[int]:
+    """查找分类在列表中的下标，不存在时返回None"""
+    return _cached_position('categories', categories, category_id)
 
 
 def remove_category_from_item(items: List[Dict[str, Any]], 
@@ -515,6 +1772,7 @@ def remove_category_from_item(items: List[Dict[str, Any]],
                                category_id: str) -> tuple[List[Dict[str, Any]], Optional[str]]:
     """
     从指定条目中删除分类关联
+    只替换items中对应的那一个条目，不重建整个列表
     
     参数:
         items: 所有条目
@@ -525,46 +1783,40 @@ def remove_category_from_item(items: List[Dict[str, Any]],
         (更新后的条目列表, 错误信息)
     """
     # 验证条目是否存在
-    item_found = False
-    updated_items = []
+    i = find_item_index(items, item_id)
+    if i is None:
+        return items, f"条目不存在: {item_id}"
     
-    for item in items:
-        if item['id'] == item_id:
-            item_found = True
-            item_copy = item.copy()
-            category_ids = item.get('categoryIds', [])
-            
-            # 验证分类是否在条目中
-            if category_id not in category_ids:
-                return items, f"条目不包含分类ID: {category_id}"
-            
-            # 删除分类关联
-            new_category_ids = [cid for cid in category_ids if cid != category_id]
-            
-            # 至少要保留一个分类
-            if len(new_category_ids) == 0:
-                return items, "条目至少需要一个分类，无法删除最后一个分类"
-            
-            item_copy['categoryIds'] = new_category_ids
-            updated_items.append(item_copy)
-        else:
-            updated_items.append(item)
+    item = items[i]
+    category_ids = item.get('categoryIds', [])
     
-    if not item_found:
-        return items, f"条目不存在: {item_id}"
+    # 验证分类是否在条目中
+    if category_id not in category_ids:
+        return items, f"条目不包含分类ID: {category_id}"
     
-    return updated_items, None
+    # 删除分类关联
+    new_category_ids = [cid for cid in category_ids if cid != category_id]
+    
+    # 至少要保留一个分类
+    if len(new_category_ids) == 0:
+        return items, "条目至少需要一个分类，无法删除最后一个分类"
+    
+    items[i] = {**item, 'categoryIds': new_category_ids}
+    return items, None
+
+
+_NO_ITEMS_MODIFIED_ERROR = "没有条目被修改，可能是分类不存在或所有条目都只有一个分类"
 
 
 def batch_remove_categories(items: List[Dict[str, Any]],
-                            item_ids: List[str],
-                            category_ids: List[str]) -> tuple[List[Dict[str, Any]], Optional[str]]:
+                            item_ids: Collection[str],
+                            category_ids: Collection[str]) -> tuple[List[Dict[str, Any]], Optional[str]]:
     """
     批量从条目中删除分类关联
     
     参数:
         items: 所有条目
-        item_ids: 条目ID列表
+        item_ids: 条目ID列表（或集合）
         category_ids: 要删除的分类ID列表
     
     返回:
@@ -577,32 +1829,34 @@ def batch_remove_categories(items: List[Dict[str, Any]],
         return items, "未提供分类ID"
     
     # 将分类ID转为集合以提高查找效率
-    categories_to_remove = set(category_ids)
+    categories_to_remove = _as_id_set(category_ids)
+    target_ids = _as_id_set(item_ids)
+    if not _has_targets(items, target_ids):
+        return items, _NO_ITEMS_MODIFIED_ERROR
+    
     updated_items = []
     modified_count = 0
     
     for item in items:
-        if item['id'] in item_ids:
-            item_copy = item.copy()
+        if item['id'] in target_ids:
             original_category_ids = item.get('categoryIds', [])
             
             # 删除指定的分类
             new_category_ids = [cid for cid in original_category_ids 
                                if cid not in categories_to_remove]
             
-            # 至少要保留一个分类
-            if len(new_category_ids) == 0:
-                # 如果会导致无分类，则保持原样
+            # 至少要保留一个分类；没有分类被删除时也保持原样
+            if len(new_category_ids) == 0 or len(new_category_ids) == len(original_category_ids):
                 updated_items.append(item)
             else:
+                item_copy = item.copy()
                 item_copy['categoryIds'] = new_category_ids
                 updated_items.append(item_copy)
-                if len(new_category_ids) != len(original_category_ids):
-                    modified_count += 1
+                modified_count += 1
         else:
             updated_items.append(item)
     
     if modified_count == 0:
-        return items, "没有条目被修改，可能是分类不存在或所有条目都只有一个分类"
+        return items, _NO_ITEMS_MODIFIED_ERROR
     
     return updated_items, None
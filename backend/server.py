@@ -3,114 +3,223 @@ Nexus Media Manager - 后端API服务器
 使用Python标准库实现的HTTP服务器，提供RESTful API
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import json
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import logging
+import re
+import threading
 import urllib.parse
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, FrozenSet, Tuple, Optional
 import data_store
 
 
+# 请求在各自线程中并发处理（解析请求、读取请求体、写回响应），
+# 读写data_store的部分由该锁串行化，避免并发的"读取-修改-保存"互相覆盖
+_data_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+# 每个处理线程复用的请求体缓冲区，超过该大小的缓冲区用完即释放，不长期持有
+BODY_BUFFER_RETAIN = 4 << 20
+_body_buffer = threading.local()
+
+# 响应体不超过该大小时与响应头拼接后一次写出；更大的响应体分两次写，避免复制整个响应体
+RESPONSE_COALESCE_LIMIT = 64 << 10
+
+# 固定不变的响应头：CORS头 - 允许前端跨域访问
+_STATIC_HEADERS = (
+    'Access-Control-Allow-Origin: *\r\n'
+    'Access-Control-Allow-Methods: GET, POST, PUT, DELETE, OPTIONS\r\n'
+    'Access-Control-Allow-Headers: Content-Type\r\n'
+)
+
+# 状态码 -> 状态行原因短语
+_REASON_PHRASES = {status.value: status.phrase for status in HTTPStatus}
+
+
+def _compile_id_routes(routes):
+    """
+    将带ID的路由编译为一个正则
+    routes中每项为 (路由名, 路径模板, 处理函数)，模板中的{id}为ID段（不能包含'/'）
+    返回 (正则, 路由名 -> 处理函数)；匹配后m.lastgroup即命中的路由名
+    """
+    patterns = []
+    for name, template, _ in routes:
+        prefix, suffix = template.split('{id}')
+        patterns.append(f'{re.escape(prefix)}(?P<{name}>[^/]*){re.escape(suffix)}')
+    return re.compile('|'.join(patterns)), {name: handler for name, _, handler in routes}
+
+
+def _match_id_route(id_routes, path: str):
+    """按带ID的路由匹配路径，返回 (处理函数, ID)，未匹配时返回 (None, None)"""
+    regex, handlers = id_routes
+    m = regex.fullmatch(path)
+    if m is None:
+        return None, None
+    return handlers[m.lastgroup], m.group(m.lastgroup)
+
+
 class APIHandler(BaseHTTPRequestHandler):
     """API请求处理器"""
     
-    def _set_headers(self, status_code: int = 200, content_type: str = 'application/json'):
-        """设置响应头"""
-        self.send_response(status_code)
-        self.send_header('Content-Type', content_type)
-        # CORS头 - 允许前端跨域访问
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+    # HTTP/1.1：连接默认保持（keep-alive），每个响应都必须带Content-Length
+    protocol_version = 'HTTP/1.1'
+    
+    # 连接空闲（或读写阻塞）超过该秒数时关闭，避免空闲的keep-alive连接一直占用处理线程
+    timeout = 30
+    
+    # _handle_locked执行期间暂存的响应 [(状态码, 响应体)]，为None时_send_json直接写出
+    _deferred_response: Optional[list] = None
+    
+    def _write_response(self, status_code: int, payload: bytes, content_type: str = 'application/json'):
+        """一次性拼好状态行和响应头，与响应体一起写出"""
+        self.log_request(status_code)
+        head = (
+            f"{self.protocol_version} {status_code} {_REASON_PHRASES.get(status_code, '')}\r\n"
+            f"Server: {self.version_string()}\r\n"
+            f"Date: {self.date_time_string()}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'close' if self.close_connection else 'keep-alive'}\r\n"
+            f"{_STATIC_HEADERS}\r\n"
+        ).encode('latin-1')
+        if len(payload) <= RESPONSE_COALESCE_LIMIT:
+            self.wfile.write(head + payload)
+        else:
+            self.wfile.write(head)
+            self.wfile.write(payload)
     
     def _send_json(self, data: Any, status_code: int = 200):
-        """发送JSON响应"""
-        self._set_headers(status_code)
-        response = json.dumps(data, ensure_ascii=False)
-        self.wfile.write(response.encode('utf-8'))
+        """发送JSON响应（与数据文件使用同一个序列化函数，直接得到UTF-8字节串）"""
+        payload = data_store.dumps(data)
+        if self._deferred_response is not None:
+            self._deferred_response.append((status_code, payload))
+        else:
+            self._write_response(status_code, payload)
+    
+    def _body_id_set(self, body: Dict[str, Any], key: str) -> Optional[FrozenSet[str]]:
+        """将请求体中的ID数组转换为集合；不是字符串数组时返回400并返回None"""
+        value = body.get(key, [])
+        if isinstance(value, list) and all(isinstance(v, str) for v in value):
+            return frozenset(value)
+        self._send_error_json(f"Invalid {key}", 400)
+        return None
+    
+    def _handle_locked(self, handler, *args):
+        """
+        在_data_lock内执行处理函数
+        
+        处理函数只在锁内序列化响应，释放锁后再写出，
+        不读取响应的慢客户端不会阻塞其他请求
+        """
+        self._deferred_response = []
+        try:
+            with _data_lock:
+                handler(self, *args)
+        finally:
+            deferred, self._deferred_response = self._deferred_response, None
+        for status_code, payload in deferred:
+            self._write_response(status_code, payload)
     
     def _send_error_json(self, message: str, status_code: int = 400):
         """发送错误响应"""
         self._send_json({"error": message}, status_code)
     
+    def _has_chunked_body(self) -> bool:
+        return 'chunked' in self.headers.get('Transfer-Encoding', '').lower()
+    
+    def _discard_body(self):
+        """
+        不需要请求体的方法（GET/DELETE/OPTIONS）：请求带有请求体时响应后关闭连接，
+        否则未读取的请求体会被当作下一个请求解析
+        """
+        if self._has_chunked_body() or self.headers.get('Content-Length', '0').strip() not in ('', '0'):
+            self.close_connection = True
+    
     def _read_body(self) -> Optional[Dict[str, Any]]:
-        """读取并解析请求体"""
+        """读取并解析请求体（读入线程内复用的缓冲区，直接从字节解析，不生成中间bytes/str）"""
+        if self._has_chunked_body():
+            # 不支持分块传输的请求体：按无法解析处理，响应后关闭连接
+            logger.warning("Error reading body: chunked transfer encoding is not supported")
+            self.close_connection = True
+            return None
         try:
             content_length = int(self.headers.get('Content-Length', 0))
-            if content_length > 0:
-                body = self.rfile.read(content_length)
-                return json.loads(body.decode('utf-8'))
-            return {}
+            if content_length < 0:
+                raise ValueError(f"invalid Content-Length: {content_length}")
+            if content_length == 0:
+                return {}
+            buf = getattr(_body_buffer, 'buf', None)
+            if buf is None or len(buf) < content_length:
+                buf = bytearray(content_length)
+            view = memoryview(buf)[:content_length]
+            received = self.rfile.readinto(view)
+            if received != content_length:
+                raise ValueError(f"incomplete body: {received}/{content_length} bytes")
+        except Exception as e:
+            logger.warning("Error reading body: %s", e)
+            # 请求体没有完整读取，无法确定下一个请求的起点，响应后关闭连接
+            self.close_connection = True
+            return None
+        _body_buffer.buf = buf if len(buf) <= BODY_BUFFER_RETAIN else None
+        try:
+            return data_store.loads(view)
         except Exception as e:
-            print(f"Error reading body: {e}")
+            logger.warning("Error reading body: %s", e)
             return None
+        finally:
+            view.release()
     
     def _parse_path(self) -> Tuple[str, Dict[str, str]]:
         """解析路径和查询参数"""
         parsed = urllib.parse.urlparse(self.path)
-        query_params = urllib.parse.parse_qs(parsed.query)
-        # 将列表值转为单个值
-        params = {k: v[0] if v else '' for k, v in query_params.items()}
+        params = {}
+        if parsed.query:
+            # 单次遍历构建字典，参数重复时保留第一个值
+            for key, value in urllib.parse.parse_qsl(parsed.query):
+                params.setdefault(key, value)
         return parsed.path, params
     
     def do_OPTIONS(self):
         """处理预检请求"""
-        self._set_headers()
+        self._discard_body()
+        self._write_response(200, b'')
     
     def do_GET(self):
         """处理GET请求"""
+        self._discard_body()
         path, params = self._parse_path()
         
-        if path == '/api/state':
-            # 获取应用状态
-            state = data_store.load_state()
-            self._send_json(state)
-        
-        elif path == '/api/items':
-            # 获取条目（支持筛选和搜索）
-            state = data_store.load_state()
-            
-            # 获取筛选参数
-            category_ids_str = params.get('categories', '')
-            search_query = params.get('search', '')
-            
-            # 解析分类ID列表（逗号分隔）
-            category_ids = [cid.strip() for cid in category_ids_str.split(',') if cid.strip()] if category_ids_str else None
-            
-            # 使用业务逻辑函数筛选条目
-            filtered_items = data_store.filter_items(
-                state['items'],
-                state['categories'],
-                category_ids,
-                search_query if search_query else None
-            )
-            
-            self._send_json(filtered_items)
+        handler = self._GET_ROUTES.get(path)
+        if handler is not None:
+            self._handle_locked(handler, params)
+            return
         
-        elif path == '/api/versions':
-            # 获取版本历史
-            versions = data_store.load_versions()
-            self._send_json(versions)
+        handler, path_id = _match_id_route(self._GET_ID_ROUTES, path)
+        if handler is not None:
+            self._handle_locked(handler, path_id)
+            return
         
-        elif path == '/api/settings':
-            # 获取设置
-            settings = data_store.load_settings()
-            self._send_json(settings)
+        self._send_error_json("Not Found", 404)
+    
+    def do_POST(self):
+        """处理POST请求"""
+        path, params = self._parse_path()
+        body = self._read_body()
         
-        elif path == '/api/export':
-            # 导出数据
-            state = data_store.load_state()
-            self._send_json(state)
+        if body is None:
+            self._send_error_json("Invalid JSON", 400)
+            return
         
-        elif path == '/':
-            # 健康检查
-            self._send_json({"status": "ok", "message": "Nexus Vault API Server"})
+        handler = self._POST_ROUTES.get(path)
+        if handler is not None:
+            self._handle_locked(handler, body)
+            return
         
-        else:
-            self._send_error_json("Not Found", 404)
+        self._send_error_json("Not Found", 404)
     
-    def do_POST(self):
-        """处理POST请求"""
+    def do_PUT(self):
+        """处理PUT请求"""
         path, params = self._parse_path()
         body = self._read_body()
         
@@ -118,25 +227,114 @@ class APIHandler(BaseHTTPRequestHandler):
             self._send_error_json("Invalid JSON", 400)
             return
         
-        if path == '/api/state':
-            # 保存应用状态
-            if data_store.save_state(body):
-                self._send_json({"success": True})
-            else:
-                self._send_error_json("Failed to save state", 500)
-        
-        elif path == '/api/categories':
-            # 创建分类
-            state = data_store.load_state()
-            state['categories'].append(body)
-            if data_store.save_state(state):
-                self._send_json(body, 201)
-            else:
-                self._send_error_json("Failed to create category", 500)
+        handler = self._PUT_ROUTES.get(path)
+        if handler is not None:
+            self._handle_locked(handler, body)
+            return
+        
+        handler, path_id = _match_id_route(self._PUT_ID_ROUTES, path)
+        if handler is not None:
+            self._handle_locked(handler, path_id, body)
+            return
         
-        elif path == '/api/items':
-            # 创建条目（带验证）
-            state = data_store.load_state()
+        self._send_error_json("Not Found", 404)
+    
+    def do_DELETE(self):
+        """处理DELETE请求"""
+        self._discard_body()
+        path, params = self._parse_path()
+        
+        handler, path_id = _match_id_route(self._DELETE_ID_ROUTES, path)
+        if handler is not None:
+            self._handle_locked(handler, path_id)
+            return
+        
+        self._send_error_json("Not Found", 404)
+    
+    # ===== GET处理函数 =====
+    
+    def _handle_get_state(self, params: Dict[str, str]):
+        """获取应用状态"""
+        state = data_store.load_state()
+        self._send_json(state)
+    
+    def _handle_get_items(self, params: Dict[str, str]):
+        """获取条目（支持筛选和搜索）"""
+        state = data_store.load_state()
+        
+        # 获取筛选参数
+        category_ids_str = params.get('categories', '')
+        search_query = params.get('search', '')
+        
+        # 解析分类ID列表（逗号分隔）
+        category_ids = [cid.strip() for cid in category_ids_str.split(',') if cid.strip()] if category_ids_str else None
+        
+        if not category_ids and not search_query.strip():
+            # 无筛选条件（首页列表）：直接返回缓存中的条目列表
+            self._send_json(state['items'])
+            return
+        
+        # 使用业务逻辑函数筛选条目
+        filtered_items = data_store.filter_items(
+            state['items'],
+            state['categories'],
+            category_ids,
+            search_query if search_query else None
+        )
+        
+        self._send_json(filtered_items)
+    
+    def _handle_get_versions(self, params: Dict[str, str]):
+        """获取版本历史（附带快照内容）"""
+        versions = data_store.load_versions(include_data=True)
+        self._send_json(versions)
+    
+    def _handle_get_version(self, version_id: str):
+        """获取指定版本的快照内容"""
+        version_data = data_store.load_version_data(version_id)
+        if version_data is not None:
+            self._send_json(version_data)
+        else:
+            self._send_error_json("Version not found", 404)
+    
+    def _handle_get_settings(self, params: Dict[str, str]):
+        """获取设置"""
+        settings = data_store.load_settings()
+        self._send_json(settings)
+    
+    def _handle_get_export(self, params: Dict[str, str]):
+        """导出数据"""
+        state = data_store.load_state()
+        self._send_json(state)
+    
+    def _handle_get_health(self, params: Dict[str, str]):
+        """健康检查"""
+        self._send_json({"status": "ok", "message": "Nexus Vault API Server"})
+    
+    # ===== POST处理函数 =====
+    
+    def _handle_post_state(self, body: Dict[str, Any]):
+        """保存应用状态"""
+        if data_store.save_state(body):
+            self._send_json({"success": True})
+        else:
+            self._send_error_json("Failed to save state", 500)
+    
+    def _handle_post_category(self, body: Dict[str, Any]):
+        """创建分类"""
+        with data_store.mutate_state() as mutation:
+            mutation.state['categories'].append(body)
+            mutation.categories_changed()
+        
+        if mutation.saved:
+            self._send_json(body, 201)
+        else:
+            self._send_error_json("Failed to create category", 500)
+    
+    def _handle_post_item(self, body: Dict[str, Any]):
+        """创建条目（带验证）"""
+        with data_store.mutate_state() as mutation:
+            state = mutation.state
             
             # 验证条目名称
             item_type = body.get('type')
@@ -158,44 +356,44 @@ class APIHandler(BaseHTTPRequestHandler):
             
             # 扩展categoryIds以包含所有祖先分类
             if body.get('categoryIds'):
-                original_ids = body['categoryIds'].copy()
                 body['categoryIds'] = data_store.expand_category_ids(
                     body['categoryIds'],
                     state['categories']
                 )
-                print(f"DEBUG: Original categoryIds: {original_ids}")
-                print(f"DEBUG: Expanded categoryIds: {body['categoryIds']}")
             
             # 验证通过，添加条目
             state['items'].insert(0, body)  # 添加到开头
-            if data_store.save_state(state):
-                self._send_json(body, 201)
-            else:
-                self._send_error_json("Failed to create item", 500)
-        
-        elif path == '/api/versions':
-            # 创建版本快照
-            label = body.get('label', 'Manual Save')
-            state_data = body.get('state')
-            if state_data:
-                version = data_store.add_version(state_data, label)
-                if version:
-                    self._send_json(version, 201)
-                else:
-                    self._send_error_json("Failed to create version", 500)
-            else:
-                self._send_error_json("Missing state data", 400)
+            mutation.items_changed([body])
         
-        elif path == '/api/import':
-            # 导入数据
-            if data_store.save_state(body):
-                self._send_json({"success": True})
+        if mutation.saved:
+            self._send_json(body, 201)
+        else:
+            self._send_error_json("Failed to create item", 500)
+    
+    def _handle_post_version(self, body: Dict[str, Any]):
+        """创建版本快照"""
+        label = body.get('label', 'Manual Save')
+        state_data = body.get('state')
+        if state_data:
+            version = data_store.add_version(state_data, label)
+            if version:
+                self._send_json(version, 201)
             else:
-                self._send_error_json("Failed to import data", 500)
-        
-        elif path == '/api/upload':
-            # 文件上传（已在前端转为Base64）
-            state = data_store.load_state()
+                self._send_error_json("Failed to create version", 500)
+        else:
+            self._send_error_json("Missing state data", 400)
+    
+    def _handle_post_import(self, body: Dict[str, Any]):
+        """导入数据"""
+        if data_store.save_state(body):
+            self._send_json({"success": True})
+        else:
+            self._send_error_json("Failed to import data", 500)
+    
+    def _handle_post_upload(self, body: Dict[str, Any]):
+        """文件上传（已在前端转为Base64）"""
+        with data_store.mutate_state() as mutation:
+            state = mutation.state
             
             # 扩展categoryIds以包含所有祖先分类
             if body.get('categoryIds'):
@@ -205,77 +403,101 @@ class APIHandler(BaseHTTPRequestHandler):
                 )
             
             state['items'].insert(0, body)
-            if data_store.save_state(state):
-                self._send_json(body, 201)
-            else:
-                self._send_error_json("Failed to upload file", 500)
+            mutation.items_changed([body])
         
-        elif path == '/api/batch/add-tags':
-            # 批量添加标签
-            item_ids = body.get('itemIds', [])
-            category_id = body.get('categoryId')
-            
-            if not item_ids or not category_id:
-                self._send_error_json("Missing itemIds or categoryId", 400)
-                return
-            
-            state = data_store.load_state()
+        if mutation.saved:
+            self._send_json(body, 201)
+        else:
+            self._send_error_json("Failed to upload file", 500)
+    
+    def _handle_post_batch_add_tags(self, body: Dict[str, Any]):
+        """批量添加标签"""
+        item_ids = self._body_id_set(body, 'itemIds')
+        if item_ids is None:
+            return
+        category_id = body.get('categoryId')
+        
+        if not item_ids or not category_id:
+            self._send_error_json("Missing itemIds or categoryId", 400)
+            return
+        
+        with data_store.mutate_state() as mutation:
+            state = mutation.state
+            old_items = state['items']
             state['items'] = data_store.batch_add_tags(
-                state['items'], 
+                old_items, 
                 item_ids, 
                 category_id,
                 state['categories']  # 传入categories以支持祖先扩展
             )
-            
-            if data_store.save_state(state):
-                self._send_json({"success": True})
-            else:
-                self._send_error_json("Failed to add tags", 500)
+            mutation.items_changed(data_store.changed_items(old_items, state['items']))
         
-        elif path == '/api/batch/edit':
-            # 批量编辑
-            item_ids = body.get('itemIds', [])
-            description = body.get('description')
-            category_id = body.get('categoryId')
-            
-            if not item_ids:
-                self._send_error_json("Missing itemIds", 400)
-                return
-            
-            state = data_store.load_state()
-            state['items'] = data_store.batch_edit(state['items'], item_ids, description, category_id)
-            
-            if data_store.save_state(state):
-                self._send_json({"success": True})
-            else:
-                self._send_error_json("Failed to batch edit", 500)
+        if mutation.saved:
+            self._send_json({"success": True})
+        else:
+            self._send_error_json("Failed to add tags", 500)
+    
+    def _handle_post_batch_edit(self, body: Dict[str, Any]):
+        """批量编辑"""
+        item_ids = self._body_id_set(body, 'itemIds')
+        if item_ids is None:
+            return
+        description = body.get('description')
+        category_id = body.get('categoryId')
         
-        elif path == '/api/batch/delete':
-            # 批量删除
-            item_ids = body.get('itemIds', [])
-            
-            if not item_ids:
-                self._send_error_json("Missing itemIds", 400)
-                return
-            
-            state = data_store.load_state()
-            state['items'] = data_store.batch_delete(state['items'], item_ids)
-            
-            if data_store.save_state(state):
-                self._send_json({"success": True})
-            else:
-                self._send_error_json("Failed to batch delete", 500)
+        if not item_ids:
+            self._send_error_json("Missing itemIds", 400)
+            return
         
-        elif path == '/api/batch/remove-categories':
-            # 批量删除分类关联
-            item_ids = body.get('itemIds', [])
-            category_ids = body.get('categoryIds', [])
-            
-            if not item_ids or not category_ids:
-                self._send_error_json("Missing itemIds or categoryIds", 400)
-                return
-            
-            state = data_store.load_state()
+        with data_store.mutate_state() as mutation:
+            state = mutation.state
+            old_items = state['items']
+            state['items'] = data_store.batch_edit(old_items, item_ids, description, category_id)
+            mutation.items_changed(data_store.changed_items(old_items, state['items']))
+        
+        if mutation.saved:
+            self._send_json({"success": True})
+        else:
+            self._send_error_json("Failed to batch edit", 500)
+    
+    def _handle_post_batch_delete(self, body: Dict[str, Any]):
+        """批量删除"""
+        item_ids = self._body_id_set(body, 'itemIds')
+        if item_ids is None:
+            return
+        
+        if not item_ids:
+            self._send_error_json("Missing itemIds", 400)
+            return
+        
+        with data_store.mutate_state() as mutation:
+            items = mutation.state['items']
+            # 只为实际存在的条目写删除标记
+            deleted_ids = frozenset(i for i in item_ids if data_store.find_item_index(items, i) is not None)
+            if deleted_ids and data_store.batch_delete_inplace(items, deleted_ids) > 0:
+                mutation.items_changed(deleted_ids=deleted_ids)
+        
+        # 没有可删除的条目时无需写盘，与删除成功一样返回
+        if mutation.saved or not mutation.dirty:
+            self._send_json({"success": True})
+        else:
+            self._send_error_json("Failed to batch delete", 500)
+    
+    def _handle_post_batch_remove_categories(self, body: Dict[str, Any]):
+        """批量删除分类关联"""
+        item_ids = self._body_id_set(body, 'itemIds')
+        if item_ids is None:
+            return
+        category_ids = self._body_id_set(body, 'categoryIds')
+        if category_ids is None:
+            return
+        
+        if not item_ids or not category_ids:
+            self._send_error_json("Missing itemIds or categoryIds", 400)
+            return
+        
+        with data_store.mutate_state() as mutation:
+            state = mutation.state
             updated_items, error = data_store.batch_remove_categories(
                 state['items'], item_ids, category_ids
             )
@@ -284,69 +506,64 @@ class APIHandler(BaseHTTPRequestHandler):
                 self._send_error_json(error, 400)
                 return
             
+            mutation.items_changed(data_store.changed_items(state['items'], updated_items))
             state['items'] = updated_items
-            if data_store.save_state(state):
-                self._send_json({"success": True})
-            else:
-                self._send_error_json("Failed to remove categories", 500)
         
-        elif path == '/api/items/toggle-category':
-            # Toggle分类关联（拖拽功能）
-            item_ids = body.get('itemIds', [])
-            category_id = body.get('categoryId')
-            
-            if not item_ids or not category_id:
-                self._send_error_json("Missing itemIds or categoryId", 400)
-                return
-            
-            state = data_store.load_state()
+        if mutation.saved:
+            self._send_json({"success": True})
+        else:
+            self._send_error_json("Failed to remove categories", 500)
+    
+    def _handle_post_toggle_category(self, body: Dict[str, Any]):
+        """Toggle分类关联（拖拽功能）"""
+        item_ids = self._body_id_set(body, 'itemIds')
+        if item_ids is None:
+            return
+        category_id = body.get('categoryId')
+        
+        if not item_ids or not category_id:
+            self._send_error_json("Missing itemIds or categoryId", 400)
+            return
+        
+        with data_store.mutate_state() as mutation:
+            state = mutation.state
+            old_items = state['items']
             state['items'] = data_store.toggle_category_association(
-                state['items'],
+                old_items,
                 item_ids,
                 category_id,
                 state['categories']
             )
-            
-            if data_store.save_state(state):
-                self._send_json({"success": True})
-            else:
-                self._send_error_json("Failed to toggle category", 500)
+            mutation.items_changed(data_store.changed_items(old_items, state['items']))
         
+        if mutation.saved:
+            self._send_json({"success": True})
         else:
-            self._send_error_json("Not Found", 404)
+            self._send_error_json("Failed to toggle category", 500)
     
-    def do_PUT(self):
-        """处理PUT请求"""
-        path, params = self._parse_path()
-        body = self._read_body()
-        
-        if body is None:
-            self._send_error_json("Invalid JSON", 400)
-            return
-        
-        # 解析路径中的ID
-        parts = path.split('/')
-        
-        if path.startswith('/api/categories/') and len(parts) == 4:
-            # 更新分类
-            category_id = parts[3]
-            state = data_store.load_state()
-            updated = False
-            for i, cat in enumerate(state['categories']):
-                if cat['id'] == category_id:
-                    state['categories'][i] = {**cat, **body}
-                    updated = True
-                    break
-            
-            if updated and data_store.save_state(state):
-                self._send_json(state['categories'][i])
-            else:
-                self._send_error_json("Category not found or update failed", 404)
+    # ===== PUT处理函数 =====
+    
+    def _handle_put_category(self, category_id: str, body: Dict[str, Any]):
+        """更新分类"""
+        updated_category = None
+        with data_store.mutate_state() as mutation:
+            categories = mutation.state['categories']
+            i = data_store.find_category_index(categories, category_id)
+            if i is not None:
+                updated_category = categories[i]
+                updated_category.update(body)
+                mutation.categories_changed()
         
-        elif path.startswith('/api/items/') and len(parts) == 4:
-            # 更新条目（带验证）
-            item_id = parts[3]
-            state = data_store.load_state()
+        if mutation.saved:
+            self._send_json(updated_category)
+        else:
+            self._send_error_json("Category not found or update failed", 404)
+    
+    def _handle_put_item(self, item_id: str, body: Dict[str, Any]):
+        """更新条目（带验证）"""
+        updated_item = None
+        with data_store.mutate_state() as mutation:
+            state = mutation.state
             
             # 验证条目名称
             item_type = body.get('type')
@@ -375,30 +592,29 @@ class APIHandler(BaseHTTPRequestHandler):
                 )
             
             # 更新条目
-            updated = False
-            updated_item = None
-            for i, item in enumerate(state['items']):
-                if item['id'] == item_id:
-                    state['items'][i] = {**item, **body}
-                    updated_item = state['items'][i]
-                    updated = True
-                    break
-            
-            if updated and data_store.save_state(state):
-                self._send_json(updated_item)
-            else:
-                self._send_error_json("Item not found or update failed", 404)
+            i = data_store.find_item_index(state['items'], item_id)
+            if i is not None:
+                updated_item = state['items'][i]
+                # 条目ID以URL为准，忽略请求体中的id，避免原地改名后旧ID在重新加载时复活
+                body.pop('id', None)
+                updated_item.update(body)
+                mutation.items_changed([updated_item])
         
-        elif path.startswith('/api/items/') and path.endswith('/remove-category') and len(parts) == 5:
-            # 删除条目的分类关联
-            item_id = parts[3]
-            category_id = body.get('categoryId')
-            
-            if not category_id:
-                self._send_error_json("Missing categoryId", 400)
-                return
-            
-            state = data_store.load_state()
+        if mutation.saved:
+            self._send_json(updated_item)
+        else:
+            self._send_error_json("Item not found or update failed", 404)
+    
+    def _handle_put_item_remove_category(self, item_id: str, body: Dict[str, Any]):
+        """删除条目的分类关联"""
+        category_id = body.get('categoryId')
+        
+        if not category_id:
+            self._send_error_json("Missing categoryId", 400)
+            return
+        
+        with data_store.mutate_state() as mutation:
+            state = mutation.state
             updated_items, error = data_store.remove_category_from_item(
                 state['items'], item_id, category_id
             )
@@ -408,72 +624,115 @@ class APIHandler(BaseHTTPRequestHandler):
                 return
             
             state['items'] = updated_items
-            if data_store.save_state(state):
-                # 返回更新后的条目
-                updated_item = next((item for item in updated_items if item['id'] == item_id), None)
-                self._send_json(updated_item)
-            else:
-                self._send_error_json("Failed to remove category", 500)
-        
-        elif path == '/api/settings':
-            # 更新设置
-            if data_store.save_settings(body):
-                self._send_json(body)
-            else:
-                self._send_error_json("Failed to update settings", 500)
+            # 返回更新后的条目
+            updated_item = updated_items[data_store.find_item_index(updated_items, item_id)]
+            mutation.items_changed([updated_item])
         
+        if mutation.saved:
+            self._send_json(updated_item)
         else:
-            self._send_error_json("Not Found", 404)
+            self._send_error_json("Failed to remove category", 500)
     
-    def do_DELETE(self):
-        """处理DELETE请求"""
-        path, params = self._parse_path()
-        parts = path.split('/')
-        
-        if path.startswith('/api/categories/') and len(parts) == 4:
-            # 删除分类
-            category_id = parts[3]
-            state = data_store.load_state()
-            original_count = len(state['categories'])
-            state['categories'] = [c for c in state['categories'] if c['id'] != category_id]
-            
-            if len(state['categories']) < original_count and data_store.save_state(state):
-                self._send_json({"success": True})
-            else:
-                self._send_error_json("Category not found or delete failed", 404)
-        
-        elif path.startswith('/api/items/') and len(parts) == 4:
-            # 删除条目
-            item_id = parts[3]
-            state = data_store.load_state()
-            original_count = len(state['items'])
-            state['items'] = [i for i in state['items'] if i['id'] != item_id]
-            
-            if len(state['items']) < original_count and data_store.save_state(state):
-                self._send_json({"success": True})
-            else:
-                self._send_error_json("Item not found or delete failed", 404)
+    def _handle_put_settings(self, body: Dict[str, Any]):
+        """更新设置"""
+        if data_store.save_settings(body):
+            self._send_json(body)
+        else:
+            self._send_error_json("Failed to update settings", 500)
+    
+    # ===== DELETE处理函数 =====
+    
+    def _handle_delete_category(self, category_id: str):
+        """删除分类"""
+        with data_store.mutate_state() as mutation:
+            categories = mutation.state['categories']
+            i = data_store.find_category_index(categories, category_id)
+            if i is not None:
+                del categories[i]
+                mutation.categories_changed()
         
-        elif path.startswith('/api/versions/') and len(parts) == 4:
-            # 删除版本
-            version_id = parts[3]
-            if data_store.delete_version(version_id):
-                self._send_json({"success": True})
-            else:
-                self._send_error_json("Version not found or delete failed", 404)
+        if mutation.saved:
+            self._send_json({"success": True})
+        else:
+            self._send_error_json("Category not found or delete failed", 404)
+    
+    def _handle_delete_item(self, item_id: str):
+        """删除条目"""
+        with data_store.mutate_state() as mutation:
+            if data_store.batch_delete_inplace(mutation.state['items'], [item_id]) > 0:
+                mutation.items_changed(deleted_ids=[item_id])
         
+        if mutation.saved:
+            self._send_json({"success": True})
+        else:
+            self._send_error_json("Item not found or delete failed", 404)
+    
+    def _handle_delete_version(self, version_id: str):
+        """删除版本"""
+        if data_store.delete_version(version_id):
+            self._send_json({"success": True})
         else:
-            self._send_error_json("Not Found", 404)
+            self._send_error_json("Version not found or delete failed", 404)
+    
+    # ===== 路由表（类加载时构建一次：精确路径为一次字典查找，带ID的路径为一次正则匹配） =====
+    
+    _GET_ROUTES = {
+        '/api/state': _handle_get_state,
+        '/api/items': _handle_get_items,
+        '/api/versions': _handle_get_versions,
+        '/api/settings': _handle_get_settings,
+        '/api/export': _handle_get_export,
+        '/': _handle_get_health,
+    }
+    _GET_ID_ROUTES = _compile_id_routes([
+        ('version', '/api/versions/{id}', _handle_get_version),
+    ])
+    
+    _POST_ROUTES = {
+        '/api/state': _handle_post_state,
+        '/api/categories': _handle_post_category,
+        '/api/items': _handle_post_item,
+        '/api/versions': _handle_post_version,
+        '/api/import': _handle_post_import,
+        '/api/upload': _handle_post_upload,
+        '/api/batch/add-tags': _handle_post_batch_add_tags,
+        '/api/batch/edit': _handle_post_batch_edit,
+        '/api/batch/delete': _handle_post_batch_delete,
+        '/api/batch/remove-categories': _handle_post_batch_remove_categories,
+        '/api/items/toggle-category': _handle_post_toggle_category,
+    }
+    
+    _PUT_ROUTES = {
+        '/api/settings': _handle_put_settings,
+    }
+    _PUT_ID_ROUTES = _compile_id_routes([
+        ('category', '/api/categories/{id}', _handle_put_category),
+        ('item', '/api/items/{id}', _handle_put_item),
+        ('item_remove_category', '/api/items/{id}/remove-category', _handle_put_item_remove_category),
+    ])
+    
+    _DELETE_ID_ROUTES = _compile_id_routes([
+        ('category', '/api/categories/{id}', _handle_delete_category),
+        ('item', '/api/items/{id}', _handle_delete_item),
+        ('version', '/api/versions/{id}', _handle_delete_version),
+    ])
     
     def log_message(self, format, *args):
-        """自定义日志格式"""
-        print(f"[{self.log_date_time_string()}] {format % args}")
+        """访问日志（INFO级别，未启用时不做任何格式化）"""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[%s] " + format, self.log_date_time_string(), *args)
+    
+    def log_error(self, format, *args):
+        """请求解析错误等（WARNING级别）"""
+        logger.warning("[%s] " + format, self.log_date_time_string(), *args)
 
 
 def run_server(port: int = 8000):
     """启动服务器"""
+    # 直接运行时在控制台输出访问日志；作为模块导入时由调用方配置日志
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     server_address = ('', port)
-    httpd = HTTPServer(server_address, APIHandler)
+    httpd = ThreadingHTTPServer(server_address, APIHandler)
     print(f"=" * 60)
     print(f"Nexus Media Manager - 后端API服务器")
     print(f"=" * 60)